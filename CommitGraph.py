@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Reads git's commit-graph files to walk history without spawning git"""
+###############################################################################
+# NAME:             CommitGraph.py
+#
+# AUTHOR:           Ethan D. Twardy <edtwardy@mtu.edu>
+#
+# DESCRIPTION:      In-process reader for objects/info/commit-graph and split
+#                   commit-graph chains. See Documentation/gitformat-commit-
+#                   graph.txt in the git source tree for the file format.
+#
+# CREATED:          10/18/2026
+#
+# LAST EDITED:      10/18/2026
+###
+
+###############################################################################
+# IMPORTS
+###
+
+import heapq
+import mmap
+import struct
+
+###############################################################################
+# Constants
+###
+
+SIGNATURE = b'CGPH'
+HASH_LENGTHS = {1: 20, 2: 32}
+PARENT_NONE = 0x70000000
+PARENT_EXTRA_EDGES = 0x80000000
+LAST_EDGE = 0x80000000
+# Written by versions of git that did not compute generation numbers.
+GENERATION_NUMBER_ZERO = 0
+
+# Flags used while painting history in CommitGraph.aheadBehind()
+LOCAL = 1
+REMOTE = 2
+BOTH = LOCAL | REMOTE
+
+###############################################################################
+# class CommitGraphFile
+###
+
+class CommitGraphFile:
+    """A single commit-graph file: either the whole graph or a layer of it."""
+
+    def __init__(self, path, basePosition):
+        """
+        Map the commit-graph file at `path'. `basePosition' is the number of
+        commits in the layers below this one.
+        """
+        with open(path, 'rb') as graphFile:
+            self.data = mmap.mmap(graphFile.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        self.basePosition = basePosition
+
+        signature, version, hashVersion, numChunks = struct.unpack_from(
+            '>4sBBB', self.data, 0)
+        if signature != SIGNATURE or version != 1 \
+           or hashVersion not in HASH_LENGTHS:
+            raise ValueError('{} is not a commit-graph file'.format(path))
+        self.hashLength = HASH_LENGTHS[hashVersion]
+
+        self.chunks = dict()
+        for index in range(numChunks):
+            chunkId, offset = struct.unpack_from('>4sQ', self.data,
+                                                 8 + 12 * index)
+            self.chunks[chunkId] = offset
+        for chunkId in (b'OIDF', b'OIDL', b'CDAT'):
+            if chunkId not in self.chunks:
+                raise ValueError('{} has no {} chunk'.format(path, chunkId))
+
+        self.fanout = struct.unpack_from('>256I', self.data,
+                                         self.chunks[b'OIDF'])
+        self.numCommits = self.fanout[255]
+
+    def lookup(self, oid):
+        """
+        Return the position of the commit with the binary object id `oid' in
+        the whole graph, or None if it is not in this file.
+        """
+        low = self.fanout[oid[0] - 1] if oid[0] else 0
+        high = self.fanout[oid[0]]
+        base = self.chunks[b'OIDL']
+        while low < high:
+            middle = (low + high) // 2
+            offset = base + middle * self.hashLength
+            candidate = self.data[offset:offset + self.hashLength]
+            if candidate == oid:
+                return self.basePosition + middle
+            if candidate < oid:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def commitData(self, position):
+        """
+        Return the (parents, generation) of the commit at `position' in the
+        whole graph, which must be in this file.
+        """
+        offset = (self.chunks[b'CDAT'] + (position - self.basePosition)
+                  * (self.hashLength + 16) + self.hashLength)
+        parent1, parent2, generationAndTime = struct.unpack_from(
+            '>IIQ', self.data, offset)
+        # The topological level occupies the top 30 bits.
+        generation = generationAndTime >> 34
+
+        parents = list()
+        if parent1 != PARENT_NONE:
+            parents.append(parent1)
+        if parent2 & PARENT_EXTRA_EDGES:
+            # Octopus merge: the rest of the parents are in the EDGE chunk.
+            offset = self.chunks[b'EDGE'] + 4 * (parent2 & ~PARENT_EXTRA_EDGES)
+            while True:
+                edge = struct.unpack_from('>I', self.data, offset)[0]
+                parents.append(edge & ~LAST_EDGE)
+                if edge & LAST_EDGE:
+                    break
+                offset += 4
+        elif parent2 != PARENT_NONE:
+            parents.append(parent2)
+        return parents, generation
+
+    def close(self):
+        """Unmap the file."""
+        self.data.close()
+
+###############################################################################
+# class CommitGraph
+###
+
+class CommitGraph:
+    """
+    The commit-graph of a repository, made of one or more layers. The parents
+    and generation number of each commit are memoized, so walks for several
+    branches of one repository share the work of decoding the graph.
+    """
+
+    def __init__(self, layers):
+        """Initialize a CommitGraph from a list of CommitGraphFile layers."""
+        self.layers = layers
+        self.commits = dict()
+
+    @classmethod
+    def load(cls, objectsDir):
+        """
+        Load the commit-graph of the object database at `objectsDir'. Returns
+        None if there is no (readable) commit-graph.
+        """
+        paths = [objectsDir + '/info/commit-graph']
+        try:
+            with open(objectsDir + '/info/commit-graphs/commit-graph-chain',
+                      'r') as chainFile:
+                paths = [objectsDir + '/info/commit-graphs/graph-{}.graph'
+                         .format(line.strip()) for line in chainFile
+                         if line.strip()]
+        except FileNotFoundError:
+            pass
+
+        layers = list()
+        try:
+            for path in paths:
+                basePosition = sum(layer.numCommits for layer in layers)
+                layers.append(CommitGraphFile(path, basePosition))
+        except (OSError, ValueError, struct.error):
+            for layer in layers:
+                layer.close()
+            return None
+        return cls(layers)
+
+    def lookup(self, objectHash):
+        """
+        Return the position of the commit with the hex id `objectHash', or None
+        if it is not in the graph.
+        """
+        oid = bytes.fromhex(objectHash)
+        for layer in self.layers:
+            position = layer.lookup(oid)
+            if position is not None:
+                return position
+        return None
+
+    def commit(self, position):
+        """INTERNAL. Return the (parents, generation) of the commit."""
+        if position not in self.commits:
+            for layer in reversed(self.layers):
+                if position >= layer.basePosition:
+                    self.commits[position] = layer.commitData(position)
+                    break
+        return self.commits[position]
+
+    def aheadBehind(self, localHash, remoteHash):
+        """
+        Return a tuple (ahead, behind) of the number of commits reachable from
+        `localHash' but not `remoteHash', and the other way around. Returns
+        None if the answer cannot be computed from the graph.
+
+        Commits are visited in decreasing order of generation number, so a
+        commit is counted only once all of its descendants in the walk have
+        painted it. The walk stops as soon as every queued commit is reachable
+        from both tips, instead of walking to the root.
+        """
+        localPosition = self.lookup(localHash)
+        remotePosition = self.lookup(remoteHash)
+        if localPosition is None or remotePosition is None:
+            return None
+
+        flags = dict()
+        queue = list()
+        nonStale = 0
+        for position, flag in ((localPosition, LOCAL),
+                               (remotePosition, REMOTE)):
+            flags[position] = flags.get(position, 0) | flag
+        for position in flags:
+            generation = self.commit(position)[1]
+            if generation == GENERATION_NUMBER_ZERO:
+                return None
+            heapq.heappush(queue, (-generation, position))
+            if flags[position] != BOTH:
+                nonStale += 1
+
+        ahead = behind = 0
+        while queue and nonStale:
+            position = heapq.heappop(queue)[1]
+            flag = flags[position]
+            if flag == LOCAL:
+                ahead += 1
+            elif flag == REMOTE:
+                behind += 1
+            if flag != BOTH:
+                nonStale -= 1
+
+            for parent in self.commit(position)[0]:
+                oldFlag = flags.get(parent)
+                if oldFlag is None:
+                    generation = self.commit(parent)[1]
+                    if generation == GENERATION_NUMBER_ZERO:
+                        return None
+                    flags[parent] = flag
+                    heapq.heappush(queue, (-generation, parent))
+                    if flag != BOTH:
+                        nonStale += 1
+                elif oldFlag | flag != oldFlag:
+                    # Parents have lower generations than their children, so
+                    # this one is still in the queue.
+                    flags[parent] = oldFlag | flag
+                    if flags[parent] == BOTH:
+                        nonStale -= 1
+        return ahead, behind
+
+    def close(self):
+        """Unmap all of the layers."""
+        for layer in self.layers:
+            layer.close()
+
+##############################################################################
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Reads the Sysgit configuration file"""
+###############################################################################
+# NAME:             Config.py
+#
+# AUTHOR:           Ethan D. Twardy <edtwardy@mtu.edu>
+#
+# DESCRIPTION:      Reads the roots to search for repositories, and the policy
+#                   for scanning each of them, from the configuration file and
+#                   the SYSGIT_PATH and SYSGIT_IGNORE environment variables.
+#                   The configuration file looks like this:
+#
+#                       [sysgit]
+#                       ignore = ~/src/vendor:~/tmp
+#                       database = ~/.local/share/sysgit/status.db
+#
+#                       [root ~/src]
+#                       max-depth = 2
+#                       one-filesystem = yes
+#                       follow-symlinks = no
+#                       remotes = no
+#
+# CREATED:          10/18/2026
+#
+# LAST EDITED:      10/18/2026
+###
+
+###############################################################################
+# IMPORTS
+###
+
+import configparser
+import copy
+import os
+
+###############################################################################
+# Constants
+###
+
+# The probe options that can be set per root, and the RepositoryFlags
+# attributes they set.
+PROBE_OPTIONS = {
+    'submodules': 'submodules',
+    'bugs': 'bugs',
+    'stash': 'stash',
+    'remotes': 'remotes',
+    'counts': 'counts',
+}
+
+###############################################################################
+# class ConfigError
+###
+
+class ConfigError(Exception):
+    """Raised when the configuration is invalid or incomplete."""
+
+###############################################################################
+# class ScanPolicy
+###
+
+class ScanPolicy:
+    """How to search one root for repositories, and how to probe them."""
+
+    #pylint: disable=too-many-arguments
+    def __init__(self, path, maxDepth=None, oneFilesystem=False,
+                 followSymlinks=False, probeOptions=None):
+        """
+        Initialize a ScanPolicy object. `maxDepth' is the number of directory
+        levels below `path' to search (None for no limit). `probeOptions' maps
+        names in PROBE_OPTIONS to the value to use for repositories in this
+        root, overriding the command line.
+        """
+        self.path = path
+        self.maxDepth = maxDepth
+        self.oneFilesystem = oneFilesystem
+        self.followSymlinks = followSymlinks
+        self.probeOptions = probeOptions or dict()
+
+    def makeFlags(self, repoFlags):
+        """
+        Return the RepositoryFlags for repositories in this root: `repoFlags'
+        itself if there are no per-root probe options, or else a copy of it
+        with the options applied.
+        """
+        if not self.probeOptions:
+            return repoFlags
+        rootFlags = copy.copy(repoFlags)
+        for option, value in self.probeOptions.items():
+            setattr(rootFlags, PROBE_OPTIONS[option], value)
+        return rootFlags
+
+    def walk(self):
+        """
+        Yield (dirpath, dirnames, filenames) like os.walk() over the root,
+        following the policy. The caller may prune dirnames.
+        """
+        try:
+            rootDevice = os.stat(self.path).st_dev
+        except FileNotFoundError:
+            return
+        visited = set()
+        for dirpath, dirnames, filenames in os.walk(
+                self.path, followlinks=self.followSymlinks):
+            if self.followSymlinks:
+                # Symbolic links can lead back to a directory we have seen.
+                status = os.stat(dirpath)
+                if (status.st_dev, status.st_ino) in visited:
+                    dirnames[:] = []
+                    continue
+                visited.add((status.st_dev, status.st_ino))
+
+            yield dirpath, dirnames, filenames
+
+            if dirpath == self.path:
+                depth = 0
+            else:
+                depth = os.path.relpath(dirpath, self.path).count(os.sep) + 1
+            if self.maxDepth is not None and depth >= self.maxDepth:
+                dirnames[:] = []
+            elif self.oneFilesystem:
+                dirnames[:] = [entry for entry in dirnames
+                               if self.getDevice(os.path.join(dirpath, entry))
+                               == rootDevice]
+
+    def getDevice(self, path):
+        """INTERNAL. Return the device `path' is on, or None if it is gone."""
+        try:
+            if self.followSymlinks:
+                return os.stat(path).st_dev
+            return os.lstat(path).st_dev
+        except OSError:
+            return None
+
+###############################################################################
+# class Config
+###
+
+class Config:
+    """The roots to search for repositories, and the paths to ignore."""
+
+    def __init__(self, path=None, requireRoots=True):
+        """
+        Read the configuration file at `path' (by default $SYSGIT_CONFIG, or
+        $XDG_CONFIG_HOME/sysgit/config), then add the roots in SYSGIT_PATH and
+        the paths in SYSGIT_IGNORE. SYSGIT_DATABASE overrides the database.
+        Raises ConfigError if there are no roots, unless `requireRoots' is
+        False.
+        """
+        if path is None:
+            configDir = os.environ.get('XDG_CONFIG_HOME',
+                                       os.path.expanduser('~/.config'))
+            path = os.environ.get('SYSGIT_CONFIG',
+                                  configDir + '/sysgit/config')
+        self.path = path
+        self.roots = list()
+        self.ignore = list()
+        # The path of the StatusStore to record each run in, if any
+        self.database = None
+
+        # Comments may follow a value, as in the README's example.
+        parser = configparser.ConfigParser(interpolation=None,
+                                           inline_comment_prefixes=('#', ';'))
+        try:
+            parser.read(self.path)
+        except configparser.Error as error:
+            raise ConfigError('{}: {}'.format(self.path, error))
+
+        for section in parser.sections():
+            if section == 'sysgit':
+                self.ignore.extend(self.splitPaths(
+                    parser.get(section, 'ignore', fallback='')))
+                self.database = parser.get(section, 'database', fallback=None)
+            elif section.startswith('root '):
+                self.roots.append(self.parseRoot(parser, section))
+            else:
+                raise ConfigError('{}: unknown section [{}]'
+                                  .format(self.path, section))
+
+        # The environment variables are still accepted. Roots that are also
+        # in the configuration file keep their policy.
+        configured = {policy.path for policy in self.roots}
+        for root in self.splitPaths(os.environ.get('SYSGIT_PATH', '')):
+            if root not in configured:
+                self.roots.append(ScanPolicy(root))
+        self.ignore.extend(self.splitPaths(os.environ.get('SYSGIT_IGNORE',
+                                                          '')))
+        self.database = os.environ.get('SYSGIT_DATABASE', self.database)
+        if self.database:
+            self.database = os.path.expanduser(self.database)
+        else:
+            self.database = None
+
+        if requireRoots and not self.roots:
+            raise ConfigError('No roots to search: set SYSGIT_PATH, or add a '
+                              '[root <path>] section to {}'.format(self.path))
+
+    @staticmethod
+    def splitPaths(paths):
+        """INTERNAL. Split a colon separated list of paths, expanding `~'."""
+        return [os.path.expanduser(path) for path in paths.split(':') if path]
+
+    def parseRoot(self, parser, section):
+        """INTERNAL. Return the ScanPolicy for a [root <path>] section."""
+        path = os.path.expanduser(section[len('root '):].strip())
+        known = {'max-depth', 'one-filesystem', 'follow-symlinks'}
+        known.update(PROBE_OPTIONS)
+        for option in parser.options(section):
+            if option not in known:
+                raise ConfigError('{}: [{}]: unknown option {}'
+                                  .format(self.path, section, option))
+        try:
+            maxDepth = parser.getint(section, 'max-depth', fallback=None)
+            oneFilesystem = parser.getboolean(section, 'one-filesystem',
+                                              fallback=False)
+            followSymlinks = parser.getboolean(section, 'follow-symlinks',
+                                               fallback=False)
+            probeOptions = dict()
+            for option in PROBE_OPTIONS:
+                if parser.has_option(section, option):
+                    probeOptions[option] = parser.getboolean(section, option)
+        except ValueError as error:
+            raise ConfigError('{}: [{}]: {}'.format(self.path, section, error))
+        return ScanPolicy(path, maxDepth=maxDepth,
+                          oneFilesystem=oneFilesystem,
+                          followSymlinks=followSymlinks,
+                          probeOptions=probeOptions)
+
+##############################################################################
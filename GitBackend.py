@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""Runs git queries on behalf of Repository objects"""
+###############################################################################
+# NAME:             GitBackend.py
+#
+# AUTHOR:           Ethan D. Twardy <edtwardy@mtu.edu>
+#
+# DESCRIPTION:      The git backend layer. A GitBackend runs the git commands
+#                   for one repository, memoizes the queries about object ids
+#                   (whose answers cannot change), and counts how many calls
+#                   were made. There are two implementations:
+#                   SubprocessBackend starts one git process (without a shell)
+#                   per query, and BatchBackend answers object and ref queries
+#                   through a long-lived `git cat-file --batch-check'
+#                   coprocess.
+#
+# CREATED:          10/18/2026
+#
+# LAST EDITED:      10/18/2026
+###
+
+###############################################################################
+# IMPORTS
+###
+
+from abc import ABC, abstractmethod
+import collections
+import subprocess
+import threading
+
+###############################################################################
+# Globals
+###
+
+# The git processes that are running, so that cancelGit() can stop them
+running = set()
+runningLock = threading.Lock()
+cancelled = threading.Event()
+
+###############################################################################
+# FUNCTIONS
+###
+
+def startGit(args, **kwargs):
+    """
+    Start git with the argument list `args' (not including `git' itself),
+    passing `kwargs' to subprocess.Popen. The process must be passed to
+    finishGit() once it has exited. Raises SystemError if cancelGit() has
+    been called.
+    """
+    with runningLock:
+        if cancelled.is_set():
+            raise SystemError('git was cancelled: git {}'.format(
+                ' '.join(args)))
+        process = subprocess.Popen(['git'] + args, **kwargs)
+        running.add(process)
+    return process
+
+def finishGit(process):
+    """Forget a process started by startGit(), which has exited."""
+    with runningLock:
+        running.discard(process)
+
+def cancelGit():
+    """
+    Terminate the git processes that are running, and make any further
+    attempt to start one raise SystemError. Probes still running on other
+    threads then fail quickly, instead of keeping the interpreter alive until
+    they finish.
+    """
+    with runningLock:
+        cancelled.set()
+        for process in running:
+            process.terminate()
+
+def runGit(args):
+    """
+    Run git with the argument list `args' (not including `git' itself), and
+    return its output as a string. Raises SystemError if git fails.
+    """
+    process = startGit(args, stdout=subprocess.PIPE)
+    try:
+        output = process.communicate()[0]
+    finally:
+        finishGit(process)
+    if process.returncode != 0:
+        raise SystemError(('git did not exit successfully. Command:\n'
+                           'git {}').format(' '.join(args)))
+    return output.decode('utf-8')
+
+def makeBackend(name, gitDir, workTree=None):
+    """Return a new backend of the kind called `name' (see BACKENDS)."""
+    return BACKENDS[name](gitDir, workTree)
+
+###############################################################################
+# class GitBackend
+###
+
+class GitBackend(ABC):
+    """Interface for running git commands against one repository."""
+    __slots__ = ('gitDir', 'workTree', 'memo')
+
+    # Calls made by all backends in this run. Repositories are probed on
+    # several threads, hence the lock.
+    totals = collections.Counter()
+    totalsLock = threading.Lock()
+
+    def __init__(self, gitDir, workTree=None):
+        """
+        Initialize a GitBackend object. `workTree' is None for bare
+        repositories.
+        """
+        self.gitDir = gitDir
+        self.workTree = workTree
+        # Created on the first memoized query
+        self.memo = None
+
+    @staticmethod
+    def count(kind):
+        """INTERNAL. Count one call of the given kind."""
+        with GitBackend.totalsLock:
+            GitBackend.totals[kind] += 1
+
+    def gitArgs(self, args):
+        """INTERNAL. Return the argument list to run `args' in this repo."""
+        gitArgs = ['--git-dir=' + self.gitDir]
+        if self.workTree is not None:
+            gitArgs.append('--work-tree=' + self.workTree)
+        return gitArgs + args
+
+    def run(self, args, memoize=False):
+        """
+        Run the git subcommand `args' (a list, e.g. ['status', '--short']) in
+        this repository and return its output. If `memoize' is True, the same
+        query is only run once until clear() or close() is called. Only
+        queries whose answer cannot change, like those about object ids, may
+        pass True.
+        """
+        key = tuple(args)
+        if memoize and self.memo and key in self.memo:
+            self.count('memoized')
+            return self.memo[key]
+        output = self.execute(args)
+        if memoize:
+            self.remember(key, output)
+        return output
+
+    def remember(self, key, value):
+        """INTERNAL. Memoize `value' as the answer to the query `key'."""
+        if self.memo is None:
+            self.memo = dict()
+        self.memo[key] = value
+
+    def lines(self, args, memoize=False):
+        """Like run(), but return a list of the lines of output."""
+        return self.run(args, memoize=memoize).splitlines()
+
+    @abstractmethod
+    def execute(self, args):
+        """INTERNAL. Run the git subcommand `args' and return its output."""
+
+    @abstractmethod
+    def resolve(self, revision):
+        """
+        Return the object id `revision' (an object id) names, or None if there
+        is no such object.
+        """
+
+    def objectExists(self, objectHash):
+        """Return True if the object `objectHash' is in the repository."""
+        return self.resolve(objectHash) is not None
+
+    def clear(self):
+        """Forget the memoized queries, so they are run again."""
+        self.memo = None
+
+    def close(self):
+        """
+        Release any resources held by the backend, including the memoized
+        queries. The backend can still be used afterwards.
+        """
+        self.clear()
+
+###############################################################################
+# class SubprocessBackend
+###
+
+class SubprocessBackend(GitBackend):
+    """Runs each query in its own git process, without a shell."""
+    __slots__ = ()
+
+    def execute(self, args):
+        """INTERNAL. Run the git subcommand `args' and return its output."""
+        self.count('processes')
+        return runGit(self.gitArgs(args))
+
+    def resolve(self, revision):
+        """
+        Return the object id `revision' names, or None if there is no such
+        object.
+        """
+        try:
+            output = self.run(['rev-parse', '--verify', '--quiet',
+                               revision + '^{object}'], memoize=True)
+        except SystemError:
+            return None
+        return output.strip()
+
+###############################################################################
+# class BatchBackend
+###
+
+class BatchBackend(SubprocessBackend):
+    """
+    Answers object and ref queries through a `git cat-file --batch-check'
+    coprocess, which is started on the first such query and kept until
+    close() is called. Other queries run in their own git process.
+    """
+
+    __slots__ = ('batch',)
+
+    def __init__(self, gitDir, workTree=None):
+        """Initialize a BatchBackend object."""
+        super().__init__(gitDir, workTree)
+        self.batch = None
+
+    def resolve(self, revision):
+        """
+        Return the object id `revision' names, or None if there is no such
+        object.
+        """
+        key = ('cat-file', revision)
+        if self.memo and key in self.memo:
+            self.count('memoized')
+            return self.memo[key]
+
+        if self.batch is None:
+            self.count('processes')
+            self.batch = startGit(
+                self.gitArgs(['cat-file', '--batch-check']),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.count('batched')
+        self.batch.stdin.write(revision.encode('utf-8') + b'\n')
+        self.batch.stdin.flush()
+        # Either `<oid> <type> <size>' or `<revision> missing'
+        reply = self.batch.stdout.readline().decode('utf-8').split()
+        if not reply:
+            raise SystemError('git cat-file --batch-check exited in {}'
+                              .format(self.gitDir))
+        if reply[-1] == 'missing':
+            # It may yet be fetched.
+            return None
+        self.remember(key, reply[0])
+        return reply[0]
+
+    def close(self):
+        """Stop the coprocess, if it was started."""
+        super().close()
+        if self.batch is not None:
+            self.batch.stdin.close()
+            self.batch.wait()
+            self.batch.stdout.close()
+            finishGit(self.batch)
+            self.batch = None
+
+###############################################################################
+# Constants
+###
+
+BACKENDS = {
+    'subprocess': SubprocessBackend,
+    'batch': BatchBackend,
+}
+
+##############################################################################
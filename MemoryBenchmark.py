@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+MemoryBenchmark.py: Measure the memory a large scan keeps alive
+"""
+###############################################################################
+# NAME:             MemoryBenchmark.py
+#
+# AUTHOR:           Ethan D. Twardy <edtwardy@mtu.edu>
+#
+# DESCRIPTION:      Builds the Repository objects of a `list -a -c' scan of a
+#                   large fleet and reports the peak memory, as measured by
+#                   tracemalloc. No git processes are started: each
+#                   repository is an empty directory with a `.git/HEAD', its
+#                   tree, stash and bugs are set through the Info setters, and
+#                   the result of comparing its branches is supplied to
+#                   checkRemotes() through its CommonDirState, as one branch
+#                   map per common directory.
+#
+# CREATED:          10/18/2026
+#
+# LAST EDITED:      10/18/2026
+###
+
+###############################################################################
+# IMPORTS
+###
+
+from argparse import ArgumentParser
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from Repository import Repository, RepositoryFlags
+from RepositoryInfo import BranchStatus
+
+###############################################################################
+# FUNCTIONS
+###
+
+def makeRepositories(top, count):
+    """
+    Create `count' repository directories under `top', each with only a
+    `.git/HEAD'. Return a list of their paths.
+    """
+    paths = list()
+    for index in range(count):
+        path = '{}/r{:06}'.format(top, index)
+        os.makedirs(path + '/.git')
+        with open(path + '/.git/HEAD', 'w') as head:
+            head.write('ref: refs/heads/main\n')
+        paths.append(path)
+    return paths
+
+def scan(paths):
+    """
+    Build and populate a Repository for each of `paths', as a `list -a -c'
+    run would, and return the list of them.
+    """
+    repoFlags = RepositoryFlags(submodules=True, bugs=True, stash=True,
+                                remotes=True, counts=True)
+    repos = list()
+    for index, path in enumerate(paths):
+        repo = Repository(path, repoFlags=repoFlags)
+        info = repo.repoInfo
+        if index % 2:
+            info.getTreeInfo().setUnstaged(1)
+            info.getTreeInfo().setUntracked(1)
+            info.setChanges(True)
+        if index % 10 == 0:
+            info.getStashInfo().setStashEntries(1)
+        repo.common.branches = {
+            'main': (BranchStatus.BEHIND, (0, index % 7 + 1)),
+        }
+        repo.checkRemotes()
+        repos.append(repo)
+    return repos
+
+def parseArgs():
+    """Parse the command line arguments."""
+    parser = ArgumentParser(description=('Report the peak memory of a scan '
+                                         'of a large fleet'))
+    parser.add_argument('-n', '--repositories', type=int, default=100000,
+                        help='number of repositories (default: %(default)s)')
+    return parser.parse_args()
+
+def main():
+    """Run the benchmark and print its results."""
+    arguments = parseArgs()
+    with tempfile.TemporaryDirectory() as top:
+        paths = makeRepositories(top, arguments.repositories)
+        tracemalloc.start()
+        start = time.monotonic()
+        repos = scan(paths)
+        seconds = time.monotonic() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('repositories: {}'.format(len(repos)))
+        print('peak memory:  {:.1f} MiB ({:.0f} B/repository)'.format(
+            peak / 2**20, peak / len(repos)))
+        print('time:         {:.2f} s (traced)'.format(seconds))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+##############################################################################
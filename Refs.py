@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Reads the refs of a git repository without spawning git"""
+###############################################################################
+# NAME:             Refs.py
+#
+# AUTHOR:           Ethan D. Twardy <edtwardy@mtu.edu>
+#
+# DESCRIPTION:      In-process reading of loose refs, packed-refs, the
+#                   repository config file, and the `.git' files and commondir
+#                   files used by linked worktrees and absorbed submodules.
+#
+# CREATED:          10/18/2026
+#
+# LAST EDITED:      10/18/2026
+###
+
+###############################################################################
+# IMPORTS
+###
+
+import os
+
+###############################################################################
+# Constants
+###
+
+# Refs that belong to a single worktree, rather than to the common directory
+PER_WORKTREE_PREFIXES = ('refs/bisect/', 'refs/worktree/', 'refs/rewritten/')
+
+###############################################################################
+# class RefStore
+###
+
+class RefStore:
+    """
+    Reads refs from the loose ref files and the packed-refs file of a git
+    directory. Loose refs take precedence over packed refs, as they do in git.
+    For a linked worktree, HEAD and the other per-worktree refs are read from
+    `gitDir', and the rest from `commonDir'.
+    """
+    __slots__ = ('gitDir', 'commonDir', 'packedRefs')
+
+    def __init__(self, gitDir, commonDir=None):
+        """Initialize a RefStore object."""
+        self.gitDir = gitDir
+        self.commonDir = gitDir if commonDir is None else commonDir
+        self.packedRefs = None
+
+    def refDir(self, refName):
+        """INTERNAL. Return the directory containing the loose `refName'."""
+        if '/' not in refName or refName.startswith(PER_WORKTREE_PREFIXES):
+            return self.gitDir
+        return self.commonDir
+
+    def getPackedRefs(self):
+        """INTERNAL. Parse the packed-refs file once, and cache the result."""
+        if self.packedRefs is None:
+            self.packedRefs = dict()
+            try:
+                with open(self.commonDir + '/packed-refs',
+                          'r') as packedRefs:
+                    for line in packedRefs:
+                        # Skip the header and the peeled tag lines.
+                        if line[0] in ('#', '^'):
+                            continue
+                        objectHash, refName = line.split()
+                        self.packedRefs[refName] = objectHash
+            except FileNotFoundError:
+                pass
+        return self.packedRefs
+
+    def readLooseRef(self, refName):
+        """INTERNAL. Return the contents of a loose ref, or None."""
+        try:
+            with open(self.refDir(refName) + '/' + refName,
+                      'r') as refFile:
+                return refFile.read().strip()
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            return None
+
+    def symbolicRef(self, refName):
+        """
+        If `refName' (e.g. HEAD) is a symbolic ref, return the name of the ref
+        it points to. Otherwise return None.
+        """
+        contents = self.readLooseRef(refName)
+        if contents is not None and contents.startswith('ref:'):
+            return contents[4:].strip()
+        return None
+
+    def readRef(self, refName):
+        """
+        Return the object hash `refName' resolves to, following symbolic refs,
+        or None if it does not exist.
+        """
+        # Git gives up on symbolic ref chains deeper than five.
+        for _ in range(5):
+            contents = self.readLooseRef(refName)
+            if contents is None:
+                return self.getPackedRefs().get(refName)
+            if not contents.startswith('ref:'):
+                return contents
+            refName = contents[4:].strip()
+        return None
+
+    def listRefs(self, prefix):
+        """
+        Return a dict mapping the name of each ref under `prefix' (e.g.
+        'refs/heads/') to the object hash it points to. Symbolic refs (like
+        refs/remotes/origin/HEAD) are omitted.
+        """
+        refs = {name: objectHash for name, objectHash
+                in self.getPackedRefs().items() if name.startswith(prefix)}
+        top = self.refDir(prefix) + '/' + prefix
+        #pylint: disable=unused-variable
+        for dirpath, dirnames, filenames in os.walk(top):
+            for filename in filenames:
+                refName = prefix + os.path.relpath(dirpath + '/' + filename,
+                                                   top)
+                contents = self.readLooseRef(refName)
+                if not contents or contents.startswith('ref:'):
+                    continue
+                refs[refName] = contents
+        return refs
+
+###############################################################################
+# FUNCTIONS
+###
+
+def readGitConfig(path):
+    """
+    Parse the git config file at `path' into a dict mapping 'section.key' or
+    'section.subsection.key' to its value. Only the subset of the syntax that
+    git itself writes is understood.
+    """
+    config = dict()
+    section = ''
+    try:
+        with open(path, 'r') as configFile:
+            for line in configFile:
+                line = line.strip()
+                if not line or line[0] in ('#', ';'):
+                    continue
+                if line[0] == '[':
+                    header = line[1:line.index(']')]
+                    if '"' in header:
+                        name, subsection = header.split('"')[0:2]
+                        section = name.strip().lower() + '.' + subsection
+                    else:
+                        section = header.strip().lower()
+                    continue
+                key, equals, value = line.partition('=')
+                value = value.strip() if equals else 'true'
+                config[section + '.' + key.strip().lower()] = value
+    except FileNotFoundError:
+        pass
+    return config
+
+def resolveGitDir(workTree):
+    """
+    Return the git directory of the working tree at `workTree'. This is
+    `workTree'/.git, unless that is a file containing a `gitdir:' line, as
+    it is in linked worktrees and absorbed submodules.
+    """
+    dotGit = workTree + '/.git'
+    if not os.path.isfile(dotGit):
+        return dotGit
+    with open(dotGit, 'r') as gitFile:
+        line = gitFile.readline().strip()
+    if not line.startswith('gitdir:'):
+        raise ValueError('{} is not a valid .git file'.format(dotGit))
+    return os.path.normpath(os.path.join(workTree, line[7:].strip()))
+
+def resolveCommonDir(gitDir):
+    """
+    Return the common directory of `gitDir', which holds the objects, the
+    shared refs and the config. It differs from `gitDir' for linked worktrees.
+    """
+    try:
+        with open(gitDir + '/commondir', 'r') as commonDirFile:
+            commonDir = commonDirFile.readline().strip()
+    except FileNotFoundError:
+        return gitDir
+    return os.path.normpath(os.path.join(gitDir, commonDir))
+
+def resolvesToGitDir(workTree):
+    """
+    Return True if the `.git' file or directory of `workTree' leads to a git
+    directory that exists: one with a HEAD, whose common directory has the
+    layout of a repository. A linked worktree whose main repository has been
+    moved does not.
+    """
+    try:
+        gitDir = resolveGitDir(workTree)
+    except (ValueError, OSError):
+        return False
+    return (os.path.isfile(gitDir + '/HEAD')
+            and isBareRepository(resolveCommonDir(gitDir)))
+
+def isBareRepository(path):
+    """
+    Return True if `path' has the layout of a bare git repository: a HEAD
+    file, and objects/ and refs/ directories.
+    """
+    return (os.path.isfile(path + '/HEAD')
+            and os.path.isdir(path + '/objects')
+            and os.path.isdir(path + '/refs'))
+
+##############################################################################
@@ -11,17 +11,21 @@ Implements the Repository object interface
 #
 # CREATED:          11/19/2018
 #
-# LAST EDITED:      03/11/2018
+# LAST EDITED:      10/18/2026
 ###
 
 ###############################################################################
 # IMPORTS
 ###
 
-import subprocess
+import threading
 import os
 
 from RepositoryInfo import RepositoryInfo, BranchStatus
+from Refs import RefStore, readGitConfig, isBareRepository, resolveGitDir, \
+    resolveCommonDir
+from CommitGraph import CommitGraph
+from GitBackend import makeBackend
 
 ###############################################################################
 # class RepositoryFlags
@@ -35,7 +39,8 @@ class RepositoryFlags:
 
     #pylint: disable=too-many-arguments
     def __init__(self, submodules=False, bugs=False, colors=True, stash=False,
-                 remotes=False, verbose=False):
+                 remotes=False, verbose=False, fetch=True, counts=False,
+                 backend='batch'):
         """Initialize a RepositoryFlags object."""
         self.submodules = submodules
         self.bugs = bugs
@@ -43,6 +48,9 @@ class RepositoryFlags:
         self.stash = stash
         self.remotes = remotes
         self.verbose = verbose
+        self.fetch = fetch
+        self.counts = counts
+        self.backend = backend
 
     def getSubmodules(self):
         """Get the value of the submodules flag."""
@@ -62,6 +70,104 @@ class RepositoryFlags:
     def getVerbose(self):
         """Get the value of the verbose flag."""
         return self.verbose
+    def getFetch(self):
+        """Get the value of the fetch flag."""
+        return self.fetch
+    def getCounts(self):
+        """Get the value of the counts flag."""
+        return self.counts
+    def getBackend(self):
+        """Get the name of the git backend to use (see GitBackend.py)."""
+        return self.backend
+
+    def setFetch(self, fetch):
+        """Set whether remote refs are updated before they are compared."""
+        self.fetch = fetch
+
+###############################################################################
+# class CommonDirState
+###
+
+class CommonDirState:
+    """
+    State shared by every worktree of one repository. Worktrees share their
+    refs, objects and remotes through a common directory, so the remote refs
+    only need to be read, fetched and compared once per common directory.
+    """
+
+    __slots__ = ('commonDir', 'lock', 'fetched', 'mirrorRefs', 'backend',
+                 'refStore', 'commitGraph', 'branches')
+
+    # Maps the real path of each common directory to its CommonDirState
+    states = dict()
+
+    def __init__(self, commonDir):
+        """Initialize a CommonDirState object."""
+        self.commonDir = commonDir
+        # Held while the worktrees' shared state is fetched or computed, as
+        # worktrees may be probed concurrently.
+        self.lock = threading.Lock()
+        self.fetched = False
+        # The upstream refs of a mirror, from the last time we asked for them.
+        self.mirrorRefs = None
+        # Created on first use, and kept for the whole run
+        self.backend = None
+        self.invalidate()
+
+    @classmethod
+    def get(cls, commonDir):
+        """Return the CommonDirState for `commonDir', creating it if needed."""
+        key = os.path.realpath(commonDir)
+        if key not in cls.states:
+            cls.states[key] = cls(commonDir)
+        return cls.states[key]
+
+    @classmethod
+    def closeAll(cls):
+        """Close the backends of every common directory, at the end of a run."""
+        for state in cls.states.values():
+            if state.backend is not None:
+                state.backend.close()
+
+    def getBackend(self, name):
+        """
+        Return the backend for queries about the refs and objects of the
+        common directory, creating a backend of the kind called `name' on
+        first use. It is shared by every worktree and kept for the whole run,
+        so its coprocess and its memoized answers (which are about object ids,
+        and so survive invalidate()) are too. Must be called with the lock
+        held.
+        """
+        if self.backend is None:
+            self.backend = makeBackend(name, self.commonDir)
+        return self.backend
+
+    def mainWorkTree(self):
+        """
+        Return the path of the main worktree of the repository, which owns
+        the branches every worktree shares: the directory holding the common
+        directory, the core.worktree of an absorbed submodule, or the common
+        directory itself if the repository is bare.
+        """
+        config = readGitConfig(self.commonDir + '/config')
+        if config.get('core.bare', 'false').lower() in ('true', 'yes', 'on',
+                                                        '1'):
+            return self.commonDir
+        if 'core.worktree' in config:
+            return os.path.normpath(os.path.join(self.commonDir,
+                                                 config['core.worktree']))
+        if os.path.basename(self.commonDir) == '.git':
+            return os.path.dirname(self.commonDir)
+        return self.commonDir
+
+    def invalidate(self):
+        """Discard the refs and comparisons read so far."""
+        self.refStore = RefStore(self.commonDir)
+        # Loaded on first use. False if the repository has no commit-graph.
+        self.commitGraph = None
+        # Maps each local branch to a tuple (BranchStatus, counts), where
+        # counts is (ahead, behind) or None.
+        self.branches = None
 
 ###############################################################################
 # class Repository
@@ -71,37 +177,74 @@ class Repository:
     """Repository:
     Class representing a Git repository.
     """
+    # There may be hundreds of thousands of these.
+    __slots__ = ('workTree', 'bare', 'gitDir', 'commonDir', 'common',
+                 'repoFlags', 'backend', 'repoInfo', 'refStore',
+                 'submoduleUTD', 'workingTreeUTD', 'submodules')
 
     def __init__(self, workTree, gitDir=None, repoFlags=None):
-        """Initialize a Repository object."""
+        """
+        Initialize a Repository object. If `workTree' is the path of a bare
+        repository, it is used as the git directory and the repository is
+        probed on the ref-only path. If `workTree'/.git is a file (a linked
+        worktree or an absorbed submodule), the git directory it names is used.
+        """
         self.workTree = workTree
+        self.bare = False
         if gitDir is None:
-            self.gitDir = workTree + '/.git'
+            if (not os.path.exists(workTree + '/.git')
+                    and isBareRepository(workTree)):
+                self.bare = True
+                self.gitDir = workTree
+            else:
+                self.gitDir = resolveGitDir(workTree)
         else:
             self.gitDir = gitDir
+        self.commonDir = resolveCommonDir(self.gitDir)
+        self.common = CommonDirState.get(self.commonDir)
 
         if repoFlags is None:
             self.repoFlags = RepositoryFlags()
         else:
             self.repoFlags = repoFlags
 
+        self.backend = makeBackend(self.repoFlags.getBackend(), self.gitDir,
+                                   None if self.bare else self.workTree)
+        self.refresh()
+
+    def refresh(self):
+        """
+        PUBLIC. Discard the state collected so far, so that the next call to
+        status() probes the repository again. The state shared with other
+        worktrees (self.common) must be invalidated separately.
+        """
         self.repoInfo = RepositoryInfo(self.repoFlags)
+        self.refStore = RefStore(self.gitDir, self.commonDir)
+        self.backend.clear()
         self.submoduleUTD = False
         self.workingTreeUTD = False
-        self.submodules = list()
+        self.submodules = ()
 
-    def status(self, stats, begin=''):
+    def probe(self):
         """
-        PUBLIC. Get status of the repository
+        PUBLIC. Probe the repository (and its submodules, if requested) without
+        building the status string. Returns True if it has changes.
         """
         if not self.workingTreeUTD:
             self.populateRepoInfo()
 
-        if self.repoFlags.getSubmodules() and not self.submoduleUTD:
+        if (self.repoFlags.getSubmodules() and not self.bare
+                and not self.submoduleUTD):
             self.populateSubmoduleInfo()
+        return self.repoInfo.hasChanges()
 
+    def status(self, stats, begin=''):
+        """
+        PUBLIC. Get status of the repository
+        """
+        changes = self.probe()
         stats = self.makeSummaryString(stats, begin=begin)
-        return (self.repoInfo.hasChanges(), stats)
+        return (changes, stats)
 
     def makeSummaryString(self, stats, begin=''):
         """
@@ -139,12 +282,15 @@ class Repository:
     def populateRepoInfo(self):
         """
         INTERNAL. Execute Git commands to populate the fields of this
-        RepositoryInfo object.
+        RepositoryInfo object. Bare repositories have no working tree, so only
+        their refs are checked.
         """
-        self.checkWorkingTree()
-        self.checkBugs()
+        if not self.bare:
+            self.checkWorkingTree()
+            self.checkBugs()
         self.checkStash()
         self.checkRemotes()
+        self.backend.close()
 
         self.workingTreeUTD = True
         return self.repoInfo.hasChanges()
@@ -154,15 +300,12 @@ class Repository:
         INTERNAL. Runs git commands to check the status of the working tree and
         populates the RepositoryInfo object as a side effect
         """
-        cmd = ('git --git-dir=xGD --work-tree=xWT status'
-               ' --ignore-submodules'
-               ' --short')
-        pipe = self.execGit(cmd.replace('xGD', self.gitDir)
-                            .replace('xWT', self.workTree))
+        output = self.backend.lines(['status', '--ignore-submodules',
+                                     '--short'])
 
         # Parse the output and populate the fields.
-        for line in pipe.stdout.readlines():
-            line = line.decode('utf-8').split(' ')
+        for line in output:
+            line = line.split(' ')
             if line[0] and '?' not in line[0]:
                 self.repoInfo.getTreeInfo().setStaged(1)
                 self.repoInfo.setChanges(True)
@@ -190,107 +333,175 @@ class Repository:
     def checkStash(self):
         """
         INTERNAL. Check the status of the repository's stash, and the number of
-        entries therein.
+        entries therein. The stash is shared by all worktrees, and each entry
+        is one line of its reflog.
         """
         if self.repoFlags.getStash():
             try:
-                with open(self.gitDir + '/refs/stash', 'r') as stashFile:
-                    (self.repoInfo.getStashInfo()
-                     .setStashEntries(len(stashFile.readlines())))
-                    self.repoInfo.setChanges(True)
+                with open(self.commonDir + '/logs/refs/stash', 'r') as stashLog:
+                    stashEntries = len(stashLog.readlines())
             except FileNotFoundError:
-                pass
+                # Reflogs are disabled, so only the latest entry is visible.
+                stashEntries = int(self.refStore.readRef('refs/stash')
+                                   is not None)
+            if stashEntries:
+                self.repoInfo.getStashInfo().setStashEntries(stashEntries)
+                self.repoInfo.setChanges(True)
 
     def checkRemotes(self):
         """
-        INTERNAL. Compare refs of the local branches against the remote refs
+        INTERNAL. Compare refs of the local branches against the remote refs.
+        The comparison is shared by all worktrees of the repository.
         """
-        # TODO: Refactor Repository.checkRemotes()
         if not self.repoFlags.getRemotes():
             return
 
-        # Update remote refs
-        self.execGit('git remote update')
-
-        # Get the name of the refs
-        localRefs = os.listdir(self.gitDir + '/refs/heads')
-        remoteRefs = list()
-        try:
-            for remote in os.listdir(self.gitDir + '/refs/remotes'):
-                for ref in os.listdir(self.gitDir + '/refs/remotes/' + remote):
-                    remoteRefs.append(remote + '/' + ref)
-        except FileNotFoundError:
-            for local in localRefs:
-                (self.repoInfo.getBranchInfo()
-                 .setBranchStatus(local, BranchStatus.NO_REMOTE))
-
-        # There's likely to be fewer locals than remotes (in large projects)
-        for local in localRefs:
-            remote = None
-            for ref in remoteRefs:
-                pieces = ref.split('/')
-                if local == pieces[-1]:
-                    # Remote refs in git are labelled remote/branch
-                    remote = '/'.join(pieces[-2:])
-                    break
-
-            if remote is None:
-                (self.repoInfo.getBranchInfo()
-                 .setBranchStatus(local, BranchStatus.NO_REMOTE))
-                continue
-
-            revParseCmd = 'git --git-dir=xGD --work-tree=xWT rev-parse '
-            mergeBaseCmd = 'git --git-dir=xGD --work-tree=xWT merge-base '
-            localHash = (self.execGit(revParseCmd
-                                      .replace('xGD', self.gitDir)
-                                      .replace('xWT', self.workTree)
-                                      + str(local))
-                         .stdout.readlines()[0])
-            remoteHash = (self.execGit(revParseCmd
-                                       .replace('xGD', self.gitDir)
-                                       .replace('xWT', self.workTree)
-                                       + str(remote))
-                          .stdout.readlines()[0])
-            baseHash = (self.execGit(mergeBaseCmd
-                                     .replace('xGD', self.gitDir)
-                                     .replace('xWT', self.workTree)
-                                     + str(local) + ' ' + str(remote))
-                        .stdout.readlines()[0])
-
-            # Compare the hashes and set the status of the branch.
-            if localHash == remoteHash:
-                (self.repoInfo.getBranchInfo()
-                 .setBranchStatus(local, BranchStatus.UP_TO_DATE))
-            elif localHash == baseHash:
-                (self.repoInfo.getBranchInfo()
-                 .setBranchStatus(local, BranchStatus.BEHIND))
-                self.repoInfo.setChanges(True)
-            elif remoteHash == baseHash:
-                (self.repoInfo.getBranchInfo()
-                 .setBranchStatus(local, BranchStatus.AHEAD))
+        branchInfo = self.repoInfo.getBranchInfo()
+        head = self.refStore.symbolicRef('HEAD')
+        if head is not None and head.startswith('refs/heads/'):
+            branchInfo.setHead(head[len('refs/heads/'):])
+
+        with self.common.lock:
+            if self.common.branches is None:
+                self.common.branches = self.compareBranches()
+        branchInfo.setBranches(self.common.branches)
+        for status, _ in self.common.branches.values():
+            if status not in (BranchStatus.UP_TO_DATE,
+                              BranchStatus.NO_REMOTE):
                 self.repoInfo.setChanges(True)
+
+    def commonBackend(self):
+        """INTERNAL. Return the backend shared by the worktrees' refs."""
+        return self.common.getBackend(self.repoFlags.getBackend())
+
+    def compareBranches(self):
+        """
+        INTERNAL. Return a dict mapping each local branch to a tuple
+        (BranchStatus, counts), where counts is (ahead, behind) or None.
+        """
+        mirrors = self.getMirrorRemotes()
+        if mirrors:
+            upstreamRefs = self.listMirrorRefs(mirrors[0])
+        else:
+            # Update remote refs
+            if self.repoFlags.getFetch() and not self.common.fetched:
+                self.commonBackend().run(['remote', 'update'])
+                self.common.fetched = True
+                self.common.invalidate()
+            upstreamRefs = self.listRemoteTrackingRefs()
+
+        branches = dict()
+        localRefs = self.common.refStore.listRefs('refs/heads/')
+        for localRef, localHash in localRefs.items():
+            branch = localRef[len('refs/heads/'):]
+            remoteHash = upstreamRefs.get(branch)
+            counts = None
+            if remoteHash is None:
+                status = BranchStatus.NO_REMOTE
+            elif localHash == remoteHash:
+                status = BranchStatus.UP_TO_DATE
+            elif mirrors and not self.commonBackend().objectExists(
+                    remoteHash):
+                # The upstream has commits the mirror has not fetched yet.
+                status = BranchStatus.BEHIND
             else:
-                (self.repoInfo.getBranchInfo()
-                 .setBranchStatus(local, BranchStatus.DIVERGED))
-                self.repoInfo.setChanges(True)
+                counts = self.compareCommits(localHash, remoteHash)
+                if not counts[0]:
+                    status = BranchStatus.BEHIND
+                elif not counts[1]:
+                    status = BranchStatus.AHEAD
+                else:
+                    status = BranchStatus.DIVERGED
+            branches[branch] = (status, counts)
+        return branches
+
+    def compareCommits(self, localHash, remoteHash):
+        """
+        INTERNAL. Return a tuple (ahead, behind) counting the commits only
+        reachable from the local commit and only from the remote commit. The
+        commit-graph is used when it contains both commits; otherwise git
+        counts them.
+        """
+        if self.common.commitGraph is None:
+            self.common.commitGraph = (CommitGraph.load(self.commonDir
+                                                        + '/objects')
+                                       or False)
+        if self.common.commitGraph:
+            counts = self.common.commitGraph.aheadBehind(localHash,
+                                                         remoteHash)
+            if counts is not None:
+                return counts
+
+        ahead, behind = self.commonBackend().run(
+            ['rev-list', '--left-right', '--count',
+             localHash + '...' + remoteHash], memoize=True).split()
+        return int(ahead), int(behind)
+
+    def listRemoteTrackingRefs(self):
+        """
+        INTERNAL. Return a dict mapping branch names to the hash of the
+        remote-tracking branch of the same name. If more than one remote has
+        the branch, the one in `origin' is preferred.
+        """
+        upstreamRefs = dict()
+        remoteRefs = self.common.refStore.listRefs('refs/remotes/')
+        for ref, objectHash in sorted(remoteRefs.items()):
+            # Remote refs in git are labelled refs/remotes/remote/branch
+            remote, branch = ref[len('refs/remotes/'):].split('/', 1)
+            if branch not in upstreamRefs or remote == 'origin':
+                upstreamRefs[branch] = objectHash
+        return upstreamRefs
+
+    def getMirrorRemotes(self):
+        """INTERNAL. Return the names of the remotes this repository mirrors."""
+        config = readGitConfig(self.commonDir + '/config')
+        return [key[len('remote.'):-len('.mirror')]
+                for key, value in config.items()
+                if key.startswith('remote.') and key.endswith('.mirror')
+                and value.lower() in ('true', 'yes', 'on', '1')]
+
+    def listMirrorRefs(self, remote):
+        """
+        INTERNAL. Return a dict mapping branch names to their hashes in the
+        upstream repository of a mirror. The mirror is not updated, so its
+        local refs can be compared against the upstream's.
+        """
+        if self.repoFlags.getFetch() and not self.common.fetched:
+            self.common.fetched = True
+            self.common.mirrorRefs = dict()
+            for line in self.commonBackend().lines(['ls-remote', '--heads',
+                                                    remote]):
+                objectHash, ref = line.split()
+                self.common.mirrorRefs[ref[len('refs/heads/'):]] = objectHash
+        return self.common.mirrorRefs or dict()
+
+    def makeSubmodules(self):
+        """
+        PUBLIC. Return a list of new Repository objects for the submodules
+        listed in the .gitmodules file, without probing them.
+        """
+        submodules = list()
+        for entry in self.parseModuleFile(self.workTree + '/.gitmodules'):
+            # Instantiate the submodule. Absorbed submodules name their git
+            # directory in a .git file.
+            workTree = self.workTree + '/' + entry['path']
+            gitDir = None
+            if not os.path.exists(workTree + '/.git'):
+                gitDir = self.gitDir + '/modules/' + entry['name']
+            submodules.append(Repository(workTree=workTree, gitDir=gitDir,
+                                         repoFlags=self.repoFlags))
+        return submodules
 
     def populateSubmoduleInfo(self):
         """INTERNAL. Execute Git commands to populate self.submodules"""
-        entries = self.parseModuleFile(self.workTree + '/.gitmodules')
-        for entry in entries:
-            # Instantiate the submodule
-            submodule = Repository(workTree=(self.workTree + '/'
-                                             + entry['path']),
-                                   gitDir=(self.gitDir + '/modules/'
-                                           + entry['name']),
-                                   repoFlags=self.repoFlags)
+        submodules = self.makeSubmodules()
+        for submodule in submodules:
             if submodule.populateRepoInfo():
                 self.repoInfo.setChanges(True)
             if submodule.populateSubmoduleInfo():
                 self.repoInfo.setChanges(True)
 
-            self.submodules.append(submodule)
-
+        self.submodules = submodules
         self.submoduleUTD = True
         return self.repoInfo.hasChanges()
 
@@ -300,9 +511,7 @@ class Repository:
         INTERNAL. Assumes moduleFile is a list of lines from a .gitmodules file
         and parses it accordingly.
         """
-        # TODO: Move git specific logic to separate module
-        #   * And use dependency injection to populate Repository
-        #   * Alternatively, use inheritance: class GitRepository(Repository)
+        entries = list()
         try:
             while True:
                 line = lines.pop(0)
@@ -327,7 +536,7 @@ class Repository:
                                 'path': modulePath})
         except IndexError:
             pass
-
+        return entries
 
     @staticmethod
     def parseModuleFile(path):
@@ -337,19 +546,9 @@ class Repository:
             with open(path, 'r') as gitmodules:
                 # Parse the .gitmodules file.
                 lines = gitmodules.readlines()
-                entries = parseGitmodules(lines)
+                entries = Repository.parseGitmodules(lines)
         except FileNotFoundError:
             pass
         return entries
 
-    @staticmethod
-    def execGit(cmd):
-        """INTERNAL. Spawns a subprocess to execute a git command"""
-        pipe = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE)
-        pipe.wait()
-        if pipe.returncode != 0:
-            raise SystemError(('git did not exit successfully. Command:\n'
-                               '{}').format(cmd))
-        return pipe
-
 ##############################################################################
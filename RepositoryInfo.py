@@ -7,11 +7,13 @@
 #
 # CREATED:          03/11/2019
 #
-# LAST EDITED:      03/11/2019
+# LAST EDITED:      10/18/2026
 ###
 
 from enum import Enum
 from abc import ABC, abstractmethod
+from types import MappingProxyType
+import sys
 
 from colorama.colorama import Fore, Style
 
@@ -45,90 +47,154 @@ class BranchStatus(Enum):
     DIVERGED = 3
     NO_REMOTE = 4
 
-class BranchInfo:
-    """Contains the state of the repository's branches."""
-    def __init__(self, colors=True):
-        self.branches = dict()
-        self.colors = colors
-        self.branchStatusStrings = {
-            BranchStatus.UP_TO_DATE: 'uu',
-            BranchStatus.BEHIND: 'lr',
-            BranchStatus.AHEAD: 'rl',
-            BranchStatus.DIVERGED: '<>',
-            BranchStatus.NO_REMOTE: '  '
-        }
+# The branches of every repository that has not been checked (yet)
+NO_BRANCHES = MappingProxyType(dict())
 
-    def __str__(self):
-        """Return a string object representing this BranchInfo instance."""
-        string = self.getBranchStatus('master')
-        if self.colors:
-            string = (Fore.MAGENTA + Style.BRIGHT + string + Style.RESET_ALL)
+class BranchInfo:
+    """
+    Contains the state of the repository's branches. The branches are shared
+    with the other worktrees of the repository, not copied.
+    """
+    __slots__ = ('branches', 'head')
+
+    # Shared by all instances
+    STATUS_STRINGS = {
+        BranchStatus.UP_TO_DATE: 'uu',
+        BranchStatus.BEHIND: 'lr',
+        BranchStatus.AHEAD: 'rl',
+        BranchStatus.DIVERGED: '<>',
+        BranchStatus.NO_REMOTE: '  '
+    }
+    COLOR = Fore.MAGENTA + Style.BRIGHT
+
+    def __init__(self):
+        # Maps each branch to a tuple (BranchStatus, counts), where counts is
+        # (ahead, behind) or None. Never modified in place.
+        self.branches = NO_BRANCHES
+        self.head = 'master'
+
+    def render(self, repoFlags):
+        """Return a string representing this BranchInfo instance."""
+        string = self.getBranchStatus(self.head)
+        if repoFlags.getCounts():
+            string += ' ' + self.getBranchCountsString(self.head)
+        if repoFlags.getColors():
+            string = self.COLOR + string + Style.RESET_ALL
         return string
 
-    def setBranchStatus(self, branch, status):
-        """Set the status of the branch indicated by the string `branch'"""
-        if not isinstance(status, BranchStatus):
-            raise ValueError('{} is not a valid branch status'.format(status))
-        self.branches[branch] = status
+    def setBranches(self, branches):
+        """
+        Set the mapping of each branch to a tuple (BranchStatus, counts). The
+        mapping is kept, not copied, so it must not be modified afterwards.
+        """
+        self.branches = branches
+
+    def getBranchCounts(self, branch):
+        """
+        Return a tuple (ahead, behind) for the branch, or None if the counts
+        are not known.
+        """
+        status, counts = self.branches.get(branch, (None, None))
+        if status == BranchStatus.UP_TO_DATE:
+            return (0, 0)
+        return counts
+
+    def getBranchCountsString(self, branch):
+        """Return a fixed width string like '+1-12' for the branch."""
+        counts = self.getBranchCounts(branch)
+        if counts is None:
+            return ' ' * 9
+        return '+{}-{}'.format(*counts).ljust(9)
+
+    def getHeadStatus(self):
+        """
+        Return the BranchStatus of the branch that is shown, or None if there
+        are no commits yet.
+        """
+        if not self.branches:
+            return None
+        return self.branches.get(self.head, (BranchStatus.NO_REMOTE,))[0]
+
+    def setHead(self, branch):
+        """Set the branch whose status is shown, normally the checked out one"""
+        # Most repositories have the same few branch names.
+        self.head = sys.intern(branch)
 
     def getBranchStatus(self, branch):
         """Return a string representing the status of the branch."""
         if not self.branches:
             return '00' # Means there are no commits yet
-        return self.branchStatusStrings[self.branches[branch]]
+        if branch not in self.branches:
+            return self.STATUS_STRINGS[BranchStatus.NO_REMOTE]
+        return self.STATUS_STRINGS[self.branches[branch][0]]
 
 class TreeInfo:
-    """Contains the state of the working tree."""
-    def __init__(self, colors=True):
-        self.workingTreeInfo = {'S': 0, 'M': 0, '?': 0}
-        self.colors = colors
+    """Contains the state of the working tree, as a bitfield."""
+    __slots__ = ('state',)
 
-    def __str__(self):
+    STAGED = 1
+    UNSTAGED = 2
+    UNTRACKED = 4
+    # The status string of each state, shared by all instances
+    STRINGS = ('   ', 'S  ', ' M ', 'SM ', '  ?', 'S ?', ' M?', 'SM?')
+    COLOR = Fore.RED + Style.BRIGHT
+
+    def __init__(self):
+        self.state = 0
+
+    def render(self, repoFlags):
         """Get a string representing the repository's working tree status."""
-        stats = ''
-        for key in self.workingTreeInfo:
-            if self.workingTreeInfo[key]:
-                stats += key
-            else:
-                stats += ' '
-
-        if self.colors:
-            stats = Fore.RED + Style.BRIGHT + stats + Style.RESET_ALL
+        stats = self.STRINGS[self.state]
+        if repoFlags.getColors():
+            stats = self.COLOR + stats + Style.RESET_ALL
         return stats
 
+    def getFlag(self, bit):
+        """INTERNAL. Return 1 if `bit' is set in the state, otherwise 0."""
+        return int(bool(self.state & bit))
+    def setFlag(self, bit, value):
+        """INTERNAL. Set or clear `bit' in the state."""
+        if value:
+            self.state |= bit
+        else:
+            self.state &= ~bit
+
     def getStaged(self):
         """Return 1 if the repository has changes staged for commit."""
-        return self.workingTreeInfo['S']
+        return self.getFlag(self.STAGED)
     def getUnstaged(self):
         """Return 1 if the repository has changes not staged for commit."""
-        return self.workingTreeInfo['M']
+        return self.getFlag(self.UNSTAGED)
     def getUntracked(self):
         """Return 1 if the repository has untracked files."""
-        return self.workingTreeInfo['?']
+        return self.getFlag(self.UNTRACKED)
 
     def setStaged(self, staged):
         """Set state of staged changes to `staged'"""
-        self.workingTreeInfo['S'] = staged
+        self.setFlag(self.STAGED, staged)
     def setUnstaged(self, unstaged):
         """Set state of unstaged changes to `unstaged'"""
-        self.workingTreeInfo['M'] = unstaged
+        self.setFlag(self.UNSTAGED, unstaged)
     def setUntracked(self, untracked):
         """Set state of untracked files to `untracked'"""
-        self.workingTreeInfo['?'] = untracked
+        self.setFlag(self.UNTRACKED, untracked)
 
 class StashInfo:
     """Encapsulates data about the stash."""
-    def __init__(self, colors=True):
+    __slots__ = ('stashEntries',)
+
+    COLOR = Fore.YELLOW + Style.BRIGHT
+
+    def __init__(self):
         self.stashEntries = 0
-        self.colors = colors
 
-    def __str__(self):
+    def render(self, repoFlags):
         """Return a string representing this instance of StashInfo."""
         string = ' '
         if self.stashEntries > 0:
             string = str(self.stashEntries)
-        if self.colors:
-            string = Fore.YELLOW + Style.BRIGHT + string + Style.RESET_ALL
+        if repoFlags.getColors():
+            string = self.COLOR + string + Style.RESET_ALL
         return string
 
     def setStashEntries(self, stashEntries):
@@ -140,17 +206,20 @@ class StashInfo:
 
 class BugInfo:
     """Encapsulates data about the state of the bugs file in the repository."""
-    def __init__(self, colors=True):
+    __slots__ = ('bugs',)
+
+    COLOR = Fore.CYAN + Style.BRIGHT
+
+    def __init__(self):
         self.bugs = False
-        self.colors = colors
 
-    def __str__(self):
+    def render(self, repoFlags):
         """Get a string representing the status of the bugs file."""
         string = ' '
         if self.bugs:
             string = 'B'
-        if self.colors:
-            string = Fore.CYAN + Style.BRIGHT + string + Style.RESET_ALL
+        if repoFlags.getColors():
+            string = self.COLOR + string + Style.RESET_ALL
         return string
 
     def setBugs(self, bugs):
@@ -166,32 +235,31 @@ class BugInfo:
 
 class RepositoryInfo:
     """RepositoryInfo
-    Contains the state of the repository object.
+    Contains the state of the repository object. The Info instances that the
+    RepositoryFlags do not ask for are None. There is one of these for every
+    repository, so the flags are shared, and no instance has a __dict__.
     """
+    __slots__ = ('repoFlags', 'changes', 'branchInfo', 'bugInfo',
+                 'stashInfo', 'treeInfo')
+
     def __init__(self, repoFlags):
         """Initialize a new RepositoryInfo object."""
+        self.repoFlags = repoFlags
         self.changes = False
-        # Set up list of info instances using information in repoFlags
-        self.info = dict()
-        if repoFlags.getRemotes():
-            self.info['BranchInfo'] = BranchInfo(repoFlags.getColors())
-
-        if repoFlags.getBugs():
-            self.info['BugInfo'] = BugInfo(repoFlags.getColors())
-
-        if repoFlags.getStash():
-            self.info['StashInfo'] = StashInfo(repoFlags.getColors())
-
+        # Set up the info instances using information in repoFlags
+        self.branchInfo = BranchInfo() if repoFlags.getRemotes() else None
+        self.bugInfo = BugInfo() if repoFlags.getBugs() else None
+        self.stashInfo = StashInfo() if repoFlags.getStash() else None
         # Always do working tree info.
-        self.info['TreeInfo'] = TreeInfo(repoFlags.getColors())
+        self.treeInfo = TreeInfo()
 
     def __str__(self):
         """Return a string representing this instance of RepositoryInfo."""
-        # Iterate in this order: BranchInfo, BugInfo, StashInfo, TreeInfo
-        # Since this order is alphabetic, we don't need to worry much about it.
         statusString = ''
-        for key in self.info:
-            statusString = statusString + str(self.info[key])
+        for info in (self.branchInfo, self.bugInfo, self.stashInfo,
+                     self.treeInfo):
+            if info is not None:
+                statusString += info.render(self.repoFlags)
         return statusString
 
     def setChanges(self, hasChanges):
@@ -201,26 +269,17 @@ class RepositoryInfo:
         """Return status of repository's hasChanges flag."""
         return self.changes
 
-    def infoInstance(self, key):
-        """
-        Return a pointer to the instance of Info object in the dict w/ key
-        """
-        try:
-            return self.info[key]
-        except KeyError:
-            return None
-
     def getBranchInfo(self):
         """Get a pointer to this BranchInfo instance"""
-        return self.infoInstance('BranchInfo')
+        return self.branchInfo
     def getBugInfo(self):
         """Get a pointer to this BugInfo instance"""
-        return self.infoInstance('BugInfo')
+        return self.bugInfo
     def getStashInfo(self):
         """Get a pointer to this StashInfo instance"""
-        return self.infoInstance('StashInfo')
+        return self.stashInfo
     def getTreeInfo(self):
         """Get a pointer to this TreeInfo instance"""
-        return self.infoInstance('TreeInfo')
+        return self.treeInfo
 
 ##############################################################################
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Schedules repository probes using the timings of previous runs"""
+###############################################################################
+# NAME:             Scheduler.py
+#
+# AUTHOR:           Ethan D. Twardy <edtwardy@mtu.edu>
+#
+# DESCRIPTION:      Keeps a history of how long each repository took to probe,
+#                   and uses it to probe the most expensive repositories
+#                   first, so that a few large repositories started last do
+#                   not set the wall-clock time of the whole run.
+#
+# CREATED:          10/18/2026
+#
+# LAST EDITED:      10/18/2026
+###
+
+###############################################################################
+# IMPORTS
+###
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import os
+import time
+
+###############################################################################
+# class ProbeHistory
+###
+
+class ProbeHistory:
+    """
+    The time each repository took to probe, and whether it was dirty, in the
+    previous runs. Stored as JSON in the user's cache directory.
+    """
+
+    # Weight of the newest sample in the moving average of probe times
+    WEIGHT = 0.5
+
+    def __init__(self, path=None):
+        """Initialize a ProbeHistory object, loading it from `path'."""
+        if path is None:
+            cacheDir = os.environ.get('XDG_CACHE_HOME',
+                                      os.path.expanduser('~/.cache'))
+            path = cacheDir + '/sysgit/history.json'
+        self.path = path
+        try:
+            with open(self.path, 'r') as historyFile:
+                self.entries = json.load(historyFile)
+        except (FileNotFoundError, ValueError):
+            self.entries = dict()
+        # The cost of repositories we have not seen, taken once per run
+        self.averageCost = 0
+        if self.entries:
+            self.averageCost = (sum(entry['seconds']
+                                    for entry in self.entries.values())
+                                / len(self.entries))
+
+    def getCost(self, path):
+        """
+        Return the expected time in seconds to probe the repository at `path'.
+        Repositories we have not seen cost as much as the average one.
+        """
+        if path in self.entries:
+            return self.entries[path]['seconds']
+        return self.averageCost
+
+    def wasDirty(self, path):
+        """Return True if the repository at `path' was dirty last time."""
+        return path in self.entries and self.entries[path]['dirty']
+
+    def record(self, path, seconds, dirty):
+        """Record that probing the repository at `path' took `seconds'."""
+        if path in self.entries:
+            seconds = (self.WEIGHT * seconds
+                       + (1 - self.WEIGHT) * self.entries[path]['seconds'])
+        self.entries[path] = {'seconds': seconds, 'dirty': dirty}
+
+    def save(self):
+        """Write the history, forgetting repositories that no longer exist."""
+        self.entries = {path: entry for path, entry in self.entries.items()
+                        if os.path.exists(path)}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as historyFile:
+            json.dump(self.entries, historyFile)
+        os.replace(temporary, self.path)
+
+###############################################################################
+# class ProbeScheduler
+###
+
+class ProbeScheduler:
+    """
+    Runs probes on a pool of threads in longest-processing-time-first order.
+    Repositories expected to take longer than a fair share of the whole run
+    get lanes of their own, so that they never hold up the cheap ones.
+    """
+
+    def __init__(self, history, jobs=1, dirtyFirst=False):
+        """Initialize a ProbeScheduler object."""
+        self.history = history
+        self.jobs = max(jobs, 1)
+        self.dirtyFirst = dirtyFirst
+
+    def order(self, repos):
+        """
+        Return `repos' sorted into the order they should be started in: the
+        most expensive first or, with dirtyFirst, the ones that were dirty
+        last time first.
+        """
+        def key(repo):
+            cost = self.history.getCost(repo.workTree)
+            if self.dirtyFirst:
+                return (not self.history.wasDirty(repo.workTree), -cost)
+            return -cost
+        return sorted(repos, key=key)
+
+    def run(self, repos, probe):
+        """
+        Call `probe' on each repository in `repos', and yield a tuple (repo,
+        result, seconds) for each as it completes. Probes that have not
+        started when the generator is closed are cancelled.
+        """
+        ordered = self.order(repos)
+        fairShare = (sum(self.history.getCost(repo.workTree) for repo in repos)
+                     / self.jobs)
+        # Fewer than `jobs' repositories can each exceed the fair share.
+        slow = set()
+        if len(ordered) > self.jobs:
+            slow = {repo for repo in ordered
+                    if self.history.getCost(repo.workTree) > fairShare}
+
+        def timedProbe(repo):
+            start = time.monotonic()
+            result = probe(repo)
+            return result, time.monotonic() - start
+
+        lanes = ThreadPoolExecutor(max_workers=max(len(slow), 1))
+        pool = ThreadPoolExecutor(max_workers=self.jobs)
+        futures = dict()
+        for repo in ordered:
+            executor = lanes if repo in slow else pool
+            futures[executor.submit(timedProbe, repo)] = repo
+        try:
+            for future in as_completed(futures):
+                result, seconds = future.result()
+                yield futures[future], result, seconds
+        finally:
+            # Don't wait for the probes that are still running.
+            lanes.shutdown(wait=False, cancel_futures=True)
+            pool.shutdown(wait=False, cancel_futures=True)
+
+##############################################################################
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""Records the state of repositories in a SQLite database"""
+###############################################################################
+# NAME:             StatusStore.py
+#
+# AUTHOR:           Ethan D. Twardy <edtwardy@mtu.edu>
+#
+# DESCRIPTION:      Keeps the state of every repository probed by each run, so
+#                   that the `report' subcommand can answer questions like
+#                   "which repositories have been dirty for a month?". Each
+#                   run is written in one transaction after probing. The same
+#                   transaction keeps a table of the state each repository and
+#                   branch is in and since when, so that reports are index
+#                   lookups rather than scans of the history.
+#
+# CREATED:          10/18/2026
+#
+# LAST EDITED:      10/18/2026
+###
+
+###############################################################################
+# IMPORTS
+###
+
+import os
+import sqlite3
+import time
+
+from RepositoryInfo import BranchStatus
+
+###############################################################################
+# Constants
+###
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS repositories (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS states (
+    run INTEGER NOT NULL REFERENCES runs (id),
+    repository INTEGER NOT NULL REFERENCES repositories (id),
+    parent INTEGER REFERENCES repositories (id),
+    time REAL NOT NULL,
+    changes INTEGER NOT NULL,
+    staged INTEGER NOT NULL,
+    unstaged INTEGER NOT NULL,
+    untracked INTEGER NOT NULL,
+    stash INTEGER,
+    bugs INTEGER,
+    head TEXT,
+    common INTEGER REFERENCES repositories (id)
+);
+CREATE INDEX IF NOT EXISTS statesByRepository ON states (repository, time);
+CREATE INDEX IF NOT EXISTS statesByTime ON states (time);
+CREATE TABLE IF NOT EXISTS branches (
+    run INTEGER NOT NULL REFERENCES runs (id),
+    repository INTEGER NOT NULL REFERENCES repositories (id),
+    branch TEXT NOT NULL,
+    time REAL NOT NULL,
+    status TEXT NOT NULL,
+    ahead INTEGER,
+    behind INTEGER
+);
+CREATE INDEX IF NOT EXISTS branchesByRepository
+    ON branches (repository, branch, time);
+CREATE TABLE IF NOT EXISTS streaks (
+    repository INTEGER NOT NULL REFERENCES repositories (id),
+    branch TEXT NOT NULL,
+    state TEXT NOT NULL,
+    since REAL NOT NULL,
+    last REAL NOT NULL,
+    PRIMARY KEY (repository, branch)
+);
+CREATE INDEX IF NOT EXISTS streaksByState ON streaks (state, since);
+"""
+
+# The name each BranchStatus is stored as
+STATUS_NAMES = {
+    BranchStatus.UP_TO_DATE: 'up-to-date',
+    BranchStatus.BEHIND: 'behind',
+    BranchStatus.AHEAD: 'ahead',
+    BranchStatus.DIVERGED: 'diverged',
+    BranchStatus.NO_REMOTE: 'no-remote',
+}
+
+# Move a repository (branch '') or branch to `state' at time `since', or, if
+# it is already in that state, extend its streak to `last'. The expressions
+# in SET see the row as it was before the update.
+UPDATE_STREAK = """
+INSERT INTO streaks (repository, branch, state, since, last)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (repository, branch) DO UPDATE SET
+    since = CASE WHEN state = excluded.state THEN since ELSE excluded.since END,
+    state = excluded.state,
+    last = excluded.last
+"""
+
+###############################################################################
+# class StatusStore
+###
+
+class StatusStore:
+    """A SQLite database of the states of repositories, one row per probe."""
+
+    def __init__(self, path):
+        """Open (or create) the database at `path'."""
+        self.path = path
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        # Readers (`report') don't block a run that is recording.
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        self.repositoryIds = dict()
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
+
+    def getRepositoryId(self, path):
+        """INTERNAL. Return the id of the repository at `path', adding it."""
+        if path not in self.repositoryIds:
+            self.connection.execute('INSERT OR IGNORE INTO repositories (path)'
+                                    ' VALUES (?)', (path,))
+            self.repositoryIds[path] = self.connection.execute(
+                'SELECT id FROM repositories WHERE path = ?',
+                (path,)).fetchone()[0]
+        return self.repositoryIds[path]
+
+    def record(self, repos, when=None):
+        """
+        Record the state of the probed repositories `repos' (and of their
+        probed submodules) as one run, in a single transaction.
+        """
+        if not repos:
+            return
+        if when is None:
+            when = time.time()
+        states = list()
+        branches = list()
+        # The repositories whose branches have been written in this run
+        commons = set()
+        with self.connection:
+            run = self.connection.execute('INSERT INTO runs (time) VALUES (?)',
+                                          (when,)).lastrowid
+            pending = [(repo, None) for repo in repos]
+            while pending:
+                repo, parent = pending.pop()
+                repository = self.getRepositoryId(repo.workTree)
+                common = None
+                branchInfo = repo.repoInfo.getBranchInfo()
+                if branchInfo is not None:
+                    # Worktrees share their branches, so they are written once,
+                    # under the main worktree.
+                    common = self.getRepositoryId(repo.common.mainWorkTree())
+                    if common not in commons:
+                        commons.add(common)
+                        self.addBranches(run, common, when, branchInfo,
+                                         branches)
+                states.append(self.makeState(run, repository, parent, when,
+                                             repo, common))
+                pending.extend((module, repository)
+                               for module in repo.submodules)
+            self.connection.executemany('INSERT INTO states VALUES'
+                                        ' (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                        states)
+            self.connection.executemany('INSERT INTO branches VALUES'
+                                        ' (?, ?, ?, ?, ?, ?, ?)', branches)
+            self.updateStreaks(states, branches, commons, when)
+
+    def updateStreaks(self, states, branches, commons, when):
+        """
+        INTERNAL. Update the streaks table from the rows of one run. Branches
+        of the repositories in `commons' that no longer exist are forgotten.
+        """
+        self.connection.executemany(UPDATE_STREAK, (
+            (row[1], '', 'dirty' if any(row[5:8]) else 'clean', when, when)
+            for row in states))
+        self.connection.executemany(UPDATE_STREAK, (
+            (row[1], row[2], row[4], when, when) for row in branches))
+        self.connection.executemany(
+            "DELETE FROM streaks WHERE repository = ? AND branch != ''"
+            ' AND last < ?', ((common, when) for common in commons))
+
+    @staticmethod
+    def makeState(run, repository, parent, when, repo, common):
+        """
+        INTERNAL. Return the row describing `repo', whose branches are
+        recorded under the repository `common'.
+        """
+        #pylint: disable=too-many-arguments
+        info = repo.repoInfo
+        treeInfo = info.getTreeInfo()
+        stashInfo = info.getStashInfo()
+        bugInfo = info.getBugInfo()
+        branchInfo = info.getBranchInfo()
+        return (
+            run, repository, parent, when, info.hasChanges(),
+            bool(treeInfo.getStaged()), bool(treeInfo.getUnstaged()),
+            bool(treeInfo.getUntracked()),
+            None if stashInfo is None else stashInfo.getStashEntries(),
+            None if bugInfo is None else bugInfo.getBugs(),
+            None if branchInfo is None else branchInfo.head, common)
+
+    @staticmethod
+    def addBranches(run, common, when, branchInfo, branches):
+        """INTERNAL. Append a row for each branch in `branchInfo'."""
+        for branch, (status, _) in branchInfo.branches.items():
+            counts = branchInfo.getBranchCounts(branch) or (None, None)
+            branches.append((run, common, branch, when,
+                             STATUS_NAMES[status]) + tuple(counts))
+
+    def streaks(self, state, olderThan):
+        """
+        INTERNAL. Return a list of tuples (path, branch, since, last) for the
+        repositories (branch '') and branches that have been in `state' since
+        at least `olderThan', oldest first.
+        """
+        return self.connection.execute(
+            'SELECT path, branch, since, last FROM streaks'
+            ' JOIN repositories ON repositories.id = streaks.repository'
+            ' WHERE state = ? AND since <= ? ORDER BY since',
+            (state, olderThan)).fetchall()
+
+    def dirtySince(self, olderThan):
+        """
+        Return a list of tuples (path, since, last) for the repositories
+        whose working tree has had changes since at least `olderThan' (a
+        time.time() value), oldest first.
+        """
+        return [(path, since, last) for path, _, since, last
+                in self.streaks('dirty', olderThan)]
+
+    def branchesSince(self, status, olderThan):
+        """
+        Return a list of tuples (path, branch, since, last) for the branches
+        that have had the BranchStatus `status' since at least `olderThan'.
+        """
+        return self.streaks(STATUS_NAMES[status], olderThan)
+
+    def history(self, path):
+        """
+        Return a list of the recorded states of the repository at `path', as
+        tuples (time, changes, staged, unstaged, untracked, stash, bugs, head,
+        status, ahead, behind), oldest first. The branch columns are those of
+        the branch that was checked out, and None if remotes were not checked.
+        """
+        return self.connection.execute(
+            'SELECT states.time, changes, staged, unstaged, untracked, stash,'
+            ' bugs, head, status, ahead, behind FROM states'
+            ' JOIN repositories ON repositories.id = states.repository'
+            ' LEFT JOIN branches ON branches.repository = states.common'
+            '  AND branches.branch = states.head'
+            '  AND branches.time = states.time'
+            ' WHERE repositories.path = ? ORDER BY states.time',
+            (path,)).fetchall()
+
+##############################################################################
@@ -13,11 +13,11 @@ Sysgit.py: List status of the system's repositories
 #                   which has a full tree in its .git/ directory. The url in
 #                   the parent's .gitmodules file is a relative path. Sysgit
 #                   does not know how to handle these, and crashes in
-#                   Repository.execGit with a SystemError.
+#                   GitBackend.runGit with a SystemError.
 #
 # CREATED:          11/19/2018
 #
-# LAST EDITED:      12/23/2018
+# LAST EDITED:      10/18/2026
 ###
 
 ###############################################################################
@@ -25,13 +25,40 @@ Sysgit.py: List status of the system's repositories
 ###
 
 from argparse import ArgumentParser, RawTextHelpFormatter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import collections
 import os
 import copy
+import datetime
+import sqlite3
 import sys
+import time
 
 from colorama import colorama
 from Logging import Logger
-from Repository import Repository, RepositoryFlags
+from Repository import Repository, RepositoryFlags, CommonDirState
+from RepositoryInfo import BranchStatus
+from Watcher import RepositoryWatcher, LiveView
+from Refs import isBareRepository, resolvesToGitDir
+from Tuner import Tuner, gitSupportsFsmonitor
+from Scheduler import ProbeHistory, ProbeScheduler
+from Config import Config, ConfigError
+from GitBackend import GitBackend, BACKENDS, cancelGit
+from StatusStore import StatusStore
+
+###############################################################################
+# Constants
+###
+
+# The name of each branch status in the output of `list --count'
+COUNT_NAMES = {
+    None: 'no-commits',
+    BranchStatus.UP_TO_DATE: 'up-to-date',
+    BranchStatus.BEHIND: 'behind',
+    BranchStatus.AHEAD: 'ahead',
+    BranchStatus.DIVERGED: 'diverged',
+    BranchStatus.NO_REMOTE: 'no-remote',
+}
 
 ###############################################################################
 # CLASSES
@@ -42,61 +69,87 @@ class Sysgit:
     """Contains the Sysgit logic"""
 
     def __init__(self, args, logFile=sys.stderr):
-        # Analogous to command line arguments
-        self.argAll = args['all']
-        self.argBugs = args['bugs']
+        # Analogous to command line arguments. Each subcommand has only some
+        # of them.
+        self.argAll = args.get('all', False)
+        self.argBackend = args['git_backend']
+        self.argBugs = args.get('bugs', False)
+        self.argCount = args.get('count', False)
+        self.argCounts = args.get('counts', False)
+        self.argDirtyFirst = args.get('dirty_first', False)
+        self.argDryRun = args.get('dry_run', False)
+        self.argExitCode = args.get('exit_code', False)
+        self.argFirst = args.get('first', False)
+        self.argDays = args.get('days', None)
         self.argFunction = args['function']
+        self.argHistory = args.get('history', None)
+        self.argJobs = args.get('jobs', None)
+        self.argMinCommits = args.get('min_commits', None)
+        self.argMinEntries = args.get('min_entries', None)
+        self.argMinLatency = args.get('min_latency', None)
         self.argNoColor = args['no_color']
-        self.argRemotes = args['remotes']
-        self.argShowStash = args['show_stash']
-        self.argSubmodules = args['submodules']
+        self.argRemotes = args.get('remotes', False)
+        self.argShowStash = args.get('show_stash', False)
+        self.argState = args.get('state', None)
+        self.argSubmodules = args.get('submodules', False)
         self.argVerbose = args['verbose']
+        self.argWatch = args.get('watch', False)
+        self.argYes = args.get('yes', False)
 
         # File like object to log to
         self.logger = Logger(logFile, not self.argNoColor)
 
+        # Set up by buildRepoList()
+        self.config = None
+        self.repoFlags = None
+
     def log(self, message):
         """Log `message' to this instance's logFile."""
         if self.argVerbose:
             self.logger.log(message)
 
     def getReposInPath(self):
-        """Return a list of repositories found in SYSGIT_PATH env var."""
-        self.log('Enumerating repositories in SYSGIT_PATH')
-        paths = [os.path.expanduser(path) for path in
-                 os.environ['SYSGIT_PATH'].split(':')]
+        """
+        Return a list of tuples (path, policy) for the repositories found in
+        the configured roots, each searched according to its ScanPolicy. Bare
+        repositories (and mirrors) are found by their layout. Linked worktrees
+        and absorbed submodules are found by their `.git' file. Like any
+        submodule, an absorbed one is listed on its own as well as under its
+        superproject.
+        """
+        self.log('Enumerating repositories in {} roots'
+                 .format(len(self.config.roots)))
         repoLocations = list()
 
         # Recursively find all of the repositories in our path
-        for path in paths:
-            #pylint: disable=unused-variable
-            for dirpath, dirnames, filenames in os.walk(path):
-                for direntry in dirnames:
-                    if '.git' in direntry:
-                        repoLocations.append(dirpath)
-                        break
-        return repoLocations or []
+        for policy in self.config.roots:
+            for dirpath, dirnames, filenames in policy.walk():
+                if '.git' in dirnames:
+                    repoLocations.append((dirpath, policy))
+                    # Nothing in the git directory is interesting to us.
+                    dirnames.remove('.git')
+                elif '.git' in filenames:
+                    if not resolvesToGitDir(dirpath):
+                        self.logger.log('{}/.git does not name a git '
+                                        'directory; skipping'.format(dirpath))
+                    else:
+                        repoLocations.append((dirpath, policy))
+                elif 'HEAD' in filenames and isBareRepository(dirpath):
+                    repoLocations.append((dirpath, policy))
+                    dirnames[:] = []
+        return repoLocations
 
     def rejectIgnoredRepos(self, repoList):
         """
-        If SYSGIT_IGNORE is set in the environment, removes these entries from
-        the list `repoList'
+        Removes the entries of `repoList' whose path contains one of the paths
+        in SYSGIT_IGNORE or the ignore setting of the configuration file.
         """
-        # Try removing all paths in SYSGIT_IGNORE
-        try:
-            ignoredRepos = [os.path.expanduser(path) for path in
-                            os.environ['SYSGIT_IGNORE'].split(':')]
-            self.log('Ignoring repos in SYSGIT_IGNORE')
-            validRepoList = list()
-            for repo in repoList:
-                for ignoredRepo in ignoredRepos:
-                    if ignoredRepo not in repo:
-                        validRepoList.append(repo)
-            repoList = validRepoList
-        except KeyError:
-            # If SYSGIT_IGNORE doesn't exit, we should carry on normally.
-            pass
-        return repoList
+        if not self.config.ignore:
+            return repoList
+        self.log('Ignoring repos in SYSGIT_IGNORE')
+        return [(repo, policy) for repo, policy in repoList
+                if not any(ignoredRepo in repo
+                           for ignoredRepo in self.config.ignore)]
 
     def findUnversionedDirectories(self, repoList):
         """
@@ -110,6 +163,10 @@ class Sysgit:
             #pylint: disable=unused-variable
             for dirpath, dirnames, filenames in os.walk(os.path.dirname(path)):
                 for entry in dirnames:
+                    # The git directory of a superproject, next to one of its
+                    # submodules
+                    if entry == '.git':
+                        continue
                     entry = dirpath + '/' + entry
                     if entry == path:
                         continue
@@ -125,39 +182,59 @@ class Sysgit:
         Get a list of Repository objects corresponding to top-level git
         repositories in the path.
         """
+        self.config = Config()
         repoList = self.rejectIgnoredRepos(self.getReposInPath())
         self.log('Discovered {} repositories'.format(len(repoList)))
         # If we were invoked with -v,--verbose; then warn about un-versioned
         # directories in SYSGIT_PATH
         if self.argVerbose:
-            self.findUnversionedDirectories(repoList)
+            self.findUnversionedDirectories([repo for repo, policy
+                                             in repoList])
 
         # Construct RepositoryFlags object
-        repoFlags = RepositoryFlags(submodules=self.argSubmodules,
-                                    bugs=self.argBugs,
-                                    colors=not self.argNoColor,
-                                    stash=self.argShowStash,
-                                    remotes=self.argRemotes,
-                                    verbose=self.argVerbose)
+        self.repoFlags = RepositoryFlags(submodules=self.argSubmodules,
+                                         bugs=self.argBugs,
+                                         colors=not self.argNoColor,
+                                         stash=self.argShowStash,
+                                         remotes=self.argRemotes,
+                                         counts=self.argCounts,
+                                         verbose=self.argVerbose,
+                                         backend=self.argBackend)
 
         # Construct repository objects
         repoInstances = list()
-        for repo in repoList:
-            repoInstances.append(Repository(repo, repoFlags=repoFlags))
+        for repo, policy in repoList:
+            repoInstances.append(Repository(
+                repo, repoFlags=policy.makeFlags(self.repoFlags)))
         return repoInstances
 
     def execute(self):
         """Executes the function of this invocation."""
         # The dict of function handlers.
         funcs = {
-            'list': self.listHandler
+            'list': self.listHandler,
+            'tune': self.tuneHandler,
+            'report': self.reportHandler
         }
         handler = funcs[self.argFunction]
         self.log('Executing {}'.format(self.argFunction))
-        if not handler():
+        try:
+            result = handler()
+        except ConfigError as error:
+            self.logger.log(str(error))
+            result = 1
+        finally:
+            # The common directories' backends are shared for the whole run.
+            CommonDirState.closeAll()
+        calls = GitBackend.totals
+        self.log('git backend: {} processes, {} batched queries, {} memoized '
+                 'queries'.format(calls['processes'], calls['batched'],
+                                  calls['memoized']))
+        if not result:
             self.log('Exiting normally')
         else:
             self.log('Exiting with errors')
+        return result
 
     ###########################################################################
     # HANDLERS
@@ -178,17 +255,382 @@ class Sysgit:
             self.argRemotes = True
 
         repos = self.buildRepoList()
+        if self.argWatch:
+            return self.watchRepos(repos)
+        if self.argCount:
+            return self.countRepos(repos)
+        if self.argFirst or self.argExitCode:
+            return self.findDirtyRepo(repos)
+
+        # Print in the order the repositories were found, as soon as each one
+        # and all of those before it have been probed.
+        blocks = dict()
+        nextRepo = 0
+        for repo, block in self.probeRepos(repos):
+            blocks[repo] = '' if block is None else block
+            while nextRepo < len(repos) and repos[nextRepo] in blocks:
+                print(blocks.pop(repos[nextRepo]), end='', flush=True)
+                nextRepo += 1
+        return 0
+
+    def probeRepos(self, repos, probe=None, dirtyFirst=None):
+        """
+        Probe `repos' concurrently, starting the ones that took longest last
+        time first, and yield a tuple (repo, result) for each one as it
+        completes. `probe' is called on each repository to get its result
+        (by default, renderRepo). A repository that cannot be probed is
+        reported, and yielded with the result None. Closing the generator
+        cancels the probes that have not started. The time each probe took is
+        saved for the next run.
+        """
+        if probe is None:
+            probe = self.renderRepo
+        probeOrError = probe
+
+        def probe(repo):
+            # One broken repository must not abort the whole run.
+            try:
+                return probeOrError(repo)
+            except (SystemError, OSError) as error:
+                return error
+        if dirtyFirst is None:
+            dirtyFirst = self.argDirtyFirst
+        history = ProbeHistory()
+        scheduler = ProbeScheduler(history, jobs=self.argJobs,
+                                   dirtyFirst=dirtyFirst)
+        results = scheduler.run(repos, probe)
+        probed = list()
+        try:
+            for repo, result, seconds in results:
+                if isinstance(result, Exception):
+                    self.logger.log('Cannot probe {}: {}'.format(
+                        repo.workTree, result))
+                    yield repo, None
+                    continue
+                history.record(repo.workTree, seconds,
+                               repo.repoInfo.hasChanges())
+                probed.append(repo)
+                yield repo, result
+        finally:
+            results.close()
+            try:
+                history.save()
+            except OSError as error:
+                self.log('Could not save probe history: {}'.format(error))
+            self.recordRepos(probed)
+
+    def recordRepos(self, repos):
+        """
+        Record the state of the probed repositories `repos' in the status
+        database, if one is configured.
+        """
+        if self.config.database is None or not repos:
+            return
+        try:
+            store = StatusStore(self.config.database)
+            try:
+                store.record(repos)
+            finally:
+                store.close()
+        except (OSError, sqlite3.Error) as error:
+            self.logger.log('Could not record status in {}: {}'.format(
+                self.config.database, error))
+
+    def findDirtyRepo(self, repos):
+        """
+        Stop at the first repository with changes, cancelling the probes that
+        have not started. With --first, print that repository. With
+        --exit-code, return 1 if there was one. The repositories that were
+        dirty last time are probed first, as they are the likeliest to be
+        dirty again.
+        """
+        probes = self.probeRepos(repos, probe=Repository.probe,
+                                 dirtyFirst=True)
+        try:
+            for repo, changes in probes:
+                if changes:
+                    if self.argFirst:
+                        print(self.renderRepo(repo), end='')
+                    # The probes that have started would otherwise run to
+                    # completion before the interpreter can exit.
+                    cancelGit()
+                    return int(self.argExitCode)
+        finally:
+            probes.close()
+        return 0
+
+    def countRepos(self, repos):
+        """
+        Print the number of repositories in each state, without building the
+        status string of any of them. With --exit-code, return 1 if any
+        repository has changes.
+        """
+        totals = collections.Counter()
+        for repo, changes in self.probeRepos(repos, probe=Repository.probe):
+            info = repo.repoInfo
+            totals['repositories'] += 1
+            if changes is None:
+                totals['unprobed'] += 1
+                continue
+            totals['dirty' if changes else 'clean'] += 1
+            treeInfo = info.getTreeInfo()
+            totals['staged'] += bool(treeInfo.getStaged())
+            totals['unstaged'] += bool(treeInfo.getUnstaged())
+            totals['untracked'] += bool(treeInfo.getUntracked())
+            if info.getStashInfo() is not None:
+                totals['stashed'] += bool(info.getStashInfo()
+                                          .getStashEntries())
+            if info.getBugInfo() is not None:
+                totals['bugs'] += bool(info.getBugInfo().getBugs())
+            if info.getBranchInfo() is not None:
+                status = info.getBranchInfo().getHeadStatus()
+                totals[COUNT_NAMES[status]] += 1
+
+        for name in ('repositories', 'clean', 'dirty', 'unprobed', 'staged',
+                     'unstaged', 'untracked', 'stashed', 'bugs') \
+                + tuple(COUNT_NAMES.values()):
+            if name in totals or name in ('repositories', 'clean', 'dirty'):
+                print('{:<13}{:>6}'.format(name, totals[name]))
+        return int(self.argExitCode and totals['dirty'] > 0)
+
+    def renderRepo(self, repo):
+        """
+        Probe `repo' and return its status string, or an empty string if it
+        should not be shown.
+        """
+        stats = ''
+        changes, stats = repo.status(stats)
+        if changes or self.argVerbose:
+            return stats
+        return ''
+
+    @staticmethod
+    def unprobedRow(repo):
+        """Return the row shown in place of a repository that failed."""
+        return '{} (could not be probed)\n'.format(repo.workTree)
+
+    def watchRepos(self, repos):
+        """
+        Show the status of `repos', then wait for inotify events and probe
+        again only the repositories that changed, redrawing their rows in
+        place. Runs until interrupted.
+        """
+        try:
+            watcher = RepositoryWatcher(logger=self.log)
+        except OSError as error:
+            self.logger.log('Cannot watch repositories: {}'.format(error))
+            return 1
+
+        # Watch before the first probe, so that changes made while it runs
+        # are not missed. `git status' opportunistically rewrites the index,
+        # which would wake us up again.
+        os.environ['GIT_OPTIONAL_LOCKS'] = '0'
+        watcher.watchRepositories(repos)
+        self.log('Watching {} directories'.format(len(watcher.watches)))
+
+        view = LiveView(sys.stdout)
+        blocks = dict(self.probeRepos(repos))
+        view.draw([self.unprobedRow(repo) if blocks[repo] is None
+                   else blocks[repo] for repo in repos])
+        for repo in repos:
+            if blocks[repo] is None:
+                watcher.unwatchRepository(repo)
+
+        # Fetching again would modify the refs we are watching.
         for repo in repos:
-            stats = ''
-            changes, stats = repo.status(stats)
-            if changes or self.argVerbose:
-                print(stats, end='')
+            repo.repoFlags.setFetch(False)
+
+        try:
+            while True:
+                changed = watcher.waitForChanges()
+                self.log('Probing {} changed repositories'
+                         .format(len(changed)))
+                # Including the state of their submodules, which are built
+                # again by the probe but find their CommonDirState cached.
+                commons = set()
+                pending = list(changed)
+                while pending:
+                    repo = pending.pop()
+                    commons.add(repo.common)
+                    pending.extend(repo.submodules)
+                for common in commons:
+                    common.invalidate()
+                blocks = list(view.blocks)
+                probed = list()
+                for index, repo in enumerate(repos):
+                    if repo in changed:
+                        repo.refresh()
+                        try:
+                            blocks[index] = self.renderRepo(repo)
+                        except (SystemError, OSError) as error:
+                            # E.g. the repository was deleted. Keep watching
+                            # the others.
+                            self.log('Cannot probe {}: {}'.format(
+                                repo.workTree, error))
+                            watcher.unwatchRepository(repo)
+                            blocks[index] = self.unprobedRow(repo)
+                            continue
+                        probed.append(repo)
+                view.update(blocks)
+                self.recordRepos(probed)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+        return 0
+
+    def tuneHandler(self):
+        """
+        Report the repositories that would benefit from git's untracked cache,
+        fsmonitor, feature.manyFiles and commit-graph, and enable them after
+        confirmation.
+        """
+        # Sanity check
+        if self.argFunction != 'tune':
+            raise RuntimeError('The wrong handler was called.')
+
+        # The settings and the commit-graph belong to the common directory,
+        # and git cannot write them from several worktrees at once. Measure
+        # the main worktree where there is one.
+        repos = list()
+        commons = set()
+        for repo in sorted(self.buildRepoList(),
+                           key=lambda repo: repo.gitDir != repo.commonDir):
+            if repo.common not in commons:
+                commons.add(repo.common)
+                repos.append(repo)
+        fsmonitor = gitSupportsFsmonitor()
+        if not fsmonitor:
+            self.log('This git has no builtin fsmonitor; skipping '
+                     'core.fsmonitor')
+        tuners = [Tuner(repo, minEntries=self.argMinEntries,
+                        minLatency=self.argMinLatency / 1000,
+                        minCommits=self.argMinCommits,
+                        fsmonitor=fsmonitor) for repo in repos]
+
+        # One at a time: a `git status' timed while other repositories are
+        # being scanned would come out slower than it really is.
+        self.log('Measuring {} repositories'.format(len(tuners)))
+        candidates = list()
+        for tuner in tuners:
+            try:
+                if tuner.measure():
+                    candidates.append(tuner)
+            except (SystemError, ValueError) as error:
+                self.logger.log('Cannot measure {}: {}'.format(
+                    tuner.repo.workTree, error))
+        if not candidates:
+            print('No repositories would benefit from tuning')
+            return 0
+
+        print('{:>8} {:>8} {:>8}    {:>8} {} {}'.format(
+            'ENTRIES', 'COMMITS', 'STATUS', 'EXPECTED', 'REPOSITORY',
+            'CHANGES'))
+        for tuner in candidates:
+            print(tuner.describe())
+        if self.argDryRun:
+            return 0
+
+        if not self.argYes:
+            try:
+                answer = input('Apply these changes to {} repositories? '
+                               '[y/N] '.format(len(candidates)))
+            except EOFError:
+                # No one to ask, e.g. under cron. Use --yes there.
+                print()
+                answer = ''
+            if answer.strip().lower() not in ('y', 'yes'):
+                return 0
+
+        errors = 0
+        with ThreadPoolExecutor(max_workers=self.argJobs) as executor:
+            futures = {executor.submit(tuner.apply): tuner
+                       for tuner in candidates}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except SystemError as error:
+                    self.logger.log('Could not tune {}: {}'.format(
+                        futures[future].repo.workTree, error))
+                    errors += 1
+        self.log('Tuned {} repositories'.format(len(candidates) - errors))
+        return int(errors > 0)
+
+    def reportHandler(self):
+        """
+        Query the status database: list the repositories that have been dirty,
+        or the branches that have been behind, ahead or diverged, for at least
+        --days days; or, with --history, every recorded state of one
+        repository.
+        """
+        # Sanity check
+        if self.argFunction != 'report':
+            raise RuntimeError('The wrong handler was called.')
+
+        self.config = Config(requireRoots=False)
+        if self.config.database is None:
+            raise ConfigError('No status database: set SYSGIT_DATABASE, or '
+                              'database in the [sysgit] section of {}'
+                              .format(self.config.path))
+        if not os.path.exists(self.config.database):
+            raise ConfigError('{}: no runs have been recorded yet'
+                              .format(self.config.database))
+        store = StatusStore(self.config.database)
+        try:
+            if self.argHistory:
+                self.reportHistory(store)
+            else:
+                self.reportStreaks(store)
+        finally:
+            store.close()
         return 0
 
+    def reportStreaks(self, store):
+        """INTERNAL. Print the repositories or branches for reportHandler."""
+        now = time.time()
+        olderThan = now - self.argDays * 24 * 60 * 60
+        if self.argState == 'dirty':
+            rows = [(path, '', since, last) for path, since, last
+                    in store.dirtySince(olderThan)]
+        else:
+            status = {'behind': BranchStatus.BEHIND,
+                      'ahead': BranchStatus.AHEAD,
+                      'diverged': BranchStatus.DIVERGED}[self.argState]
+            rows = store.branchesSince(status, olderThan)
+        if not rows:
+            return
+        print('{:<16} {:>6} {:<16} {}'.format('SINCE', 'DAYS', 'LAST SEEN',
+                                              'REPOSITORY'))
+        for path, branch, since, last in rows:
+            print('{:<16} {:>6.1f} {:<16} {}{}'.format(
+                formatTime(since), (now - since) / (24 * 60 * 60),
+                formatTime(last), path, ' ' + branch if branch else ''))
+
+    def reportHistory(self, store):
+        """INTERNAL. Print the recorded states of one repository."""
+        path = os.path.abspath(os.path.expanduser(self.argHistory))
+        for when, changes, staged, unstaged, untracked, stash, bugs, head, \
+                status, ahead, behind in store.history(path):
+            tree = ''.join(flag if value else ' ' for flag, value
+                           in (('S', staged), ('M', unstaged),
+                               ('?', untracked)))
+            branch = ''
+            if head is not None:
+                branch = '{} {}'.format(head, status or '')
+                if ahead is not None:
+                    branch += ' +{}-{}'.format(ahead, behind)
+            print('{:<16} {} {:>2} {} {} {}'.format(
+                formatTime(when), '*' if changes else ' ',
+                stash or '', 'B' if bugs else ' ', tree, branch).rstrip())
+
 ###############################################################################
 # FUNCTIONS
 ###
 
+def formatTime(when):
+    """Format the time.time() value `when' for reports."""
+    return datetime.datetime.fromtimestamp(when).strftime('%Y-%m-%d %H:%M')
+
 def parseArgs():
     """
     Parse the command line arguments
@@ -203,6 +645,13 @@ def parseArgs():
                               'of changes; show directories in SYSGIT_PATH '
                               'that are not under version control'),
                         action='store_true', default=False)
+    parser.add_argument('--git-backend', choices=sorted(BACKENDS),
+                        default='batch',
+                        help=('how to run git: "subprocess" starts one git '
+                              'process per query, "batch" (the default) also '
+                              'answers object queries through one '
+                              '`git cat-file --batch-check\' per repository, '
+                              'shared by its worktrees for the whole run'))
     subparsers = parser.add_subparsers(dest='function',
                                        help='help for subcommand')
 
@@ -235,8 +684,93 @@ def parseArgs():
                                   "  * '  ': local has no remote branch\n"
                                   "  * '00': local has no commits yet"),
                             action='store_true', default=False)
+    listParser.add_argument('-c', '--counts',
+                            help=('with -r, also show the number of commits '
+                                  'the checked out\nbranch is ahead of and '
+                                  'behind its remote, e.g. "+1-12"'),
+                            action='store_true', default=False)
     listParser.add_argument('-a', '--all', help=('Same as -bspr'),
                             action='store_true', default=False)
+    listParser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                            help=('number of repositories to probe at once '
+                                  '(default: %(default)s)'))
+    listParser.add_argument('--dirty-first',
+                            help=('start with the repositories that were '
+                                  'dirty last time,\ninstead of the ones '
+                                  'that took longest to probe'),
+                            action='store_true', default=False)
+    listModes = listParser.add_mutually_exclusive_group()
+    listModes.add_argument('-w', '--watch',
+                           help=('keep running, and redraw the status of '
+                                 'repositories as\ninotify reports changes '
+                                 'to them (Linux only)'),
+                           action='store_true', default=False)
+    listModes.add_argument('--first',
+                           help=('stop at the first repository with changes, '
+                                 'and print only\nthat repository'),
+                           action='store_true', default=False)
+    listModes.add_argument('--count',
+                           help=('print the number of repositories in each '
+                                 'state, instead of\nthe repositories'),
+                           action='store_true', default=False)
+    listParser.add_argument('--exit-code',
+                            help=('exit with 1 if any repository has changes, '
+                                  'and 0 otherwise.\nUnless --count is '
+                                  'given, nothing is printed, and probing\n'
+                                  'stops at the first repository with '
+                                  'changes'),
+                            action='store_true', default=False)
+
+    # { tune }
+    tuneParser = subparsers.add_parser('tune', help=('enable git\'s '
+                                                     'performance features in '
+                                                     'the repositories that '
+                                                     'would benefit'),
+                                       formatter_class=RawTextHelpFormatter)
+    tuneParser.add_argument('-n', '--dry-run',
+                            help=('only show the repositories that would be '
+                                  'tuned, with\nthe measured and expected '
+                                  'time of `git status\''),
+                            action='store_true', default=False)
+    tuneParser.add_argument('-y', '--yes',
+                            help=('do not ask for confirmation'),
+                            action='store_true', default=False)
+    tuneParser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                            help=('number of repositories to tune at once; '
+                                  'they are\nmeasured one at a time '
+                                  '(default: %(default)s)'))
+    tuneParser.add_argument('--min-entries', type=int, default=10000,
+                            help=('tune repositories whose index has at least '
+                                  'this many\nentries (default: '
+                                  '%(default)s)'))
+    tuneParser.add_argument('--min-latency', type=int, default=100,
+                            help=('tune repositories where `git status\' '
+                                  'takes at least\nthis many milliseconds '
+                                  '(default: %(default)s)'))
+    tuneParser.add_argument('--min-commits', type=int, default=10000,
+                            help=('write a commit-graph in repositories with '
+                                  'at least this\nmany commits (default: '
+                                  '%(default)s)'))
+
+    # { report }
+    reportParser = subparsers.add_parser('report', help=('query the states '
+                                                         'recorded in the '
+                                                         'status database'),
+                                         formatter_class=RawTextHelpFormatter)
+    reportParser.add_argument('--state', default='dirty',
+                              choices=('dirty', 'behind', 'ahead',
+                                       'diverged'),
+                              help=('list the repositories that are dirty, '
+                                    'or the branches that\nare behind, ahead '
+                                    'of or diverged from their remote,\nand '
+                                    'since when (default: %(default)s)'))
+    reportParser.add_argument('-d', '--days', type=float, default=0,
+                              help=('only list those that have been in that '
+                                    'state for at\nleast this many days '
+                                    '(default: %(default)s)'))
+    reportParser.add_argument('--history', metavar='REPOSITORY',
+                              help=('print every recorded state of the '
+                                    'repository instead'))
 
     # Print help if no arguments were given
     if len(sys.argv) < 2:
@@ -244,7 +778,10 @@ def parseArgs():
         sys.exit()
 
     # Parse the arguments
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.function == 'list' and args.watch and args.exit_code:
+        listParser.error('--exit-code cannot be used with --watch')
+    return args
 
 ###############################################################################
 # MAIN
@@ -262,7 +799,7 @@ def main():
 
     # Execute the function
     sysgit = Sysgit(arguments)
-    sysgit.execute()
+    result = sysgit.execute()
 
     # TODO: subparser "descriptions" in argparse
 
@@ -291,10 +828,9 @@ def main():
     #   * Shows 'XX' if a branch does not have a remote counterpart.
     #   * Shows full path of submodules
 
-    # TODO: Cannot handle bare repositories
-    return 0
+    return result
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
 
 ##############################################################################
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Enables git's performance features in repositories that benefit"""
+###############################################################################
+# NAME:             Tuner.py
+#
+# AUTHOR:           Ethan D. Twardy <edtwardy@mtu.edu>
+#
+# DESCRIPTION:      Implements the logic behind the `tune' subcommand: measure
+#                   the cost of `git status' in a repository and turn on the
+#                   untracked cache, fsmonitor, feature.manyFiles and the
+#                   commit-graph where they would help.
+#
+# CREATED:          10/18/2026
+#
+# LAST EDITED:      10/18/2026
+###
+
+###############################################################################
+# IMPORTS
+###
+
+import os
+import struct
+import time
+
+from Refs import readGitConfig
+from GitBackend import runGit
+
+###############################################################################
+# FUNCTIONS
+###
+
+def readIndexEntryCount(gitDir):
+    """Return the number of entries in the index of `gitDir', without git."""
+    #pylint: disable=unused-variable
+    try:
+        with open(gitDir + '/index', 'rb') as indexFile:
+            signature, version, entries = struct.unpack('>4sII',
+                                                        indexFile.read(12))
+    except (FileNotFoundError, struct.error):
+        return 0
+    if signature != b'DIRC':
+        return 0
+    return entries
+
+def gitSupportsFsmonitor():
+    """Return True if this build of git has the builtin fsmonitor daemon."""
+    return 'fsmonitor--daemon' in runGit(['version', '--build-options'])
+
+###############################################################################
+# class Tuner
+###
+
+class Tuner:
+    """
+    Measures a repository and decides which of git's accelerators to enable
+    in it.
+    """
+
+    # Each setting, and the value that turns it on
+    STATUS_SETTINGS = (('core.untrackedCache', 'true'),
+                       ('core.fsmonitor', 'true'),
+                       ('feature.manyFiles', 'true'))
+
+    #pylint: disable=too-many-arguments
+    def __init__(self, repo, minEntries=10000, minLatency=0.1,
+                 minCommits=10000, manyFiles=100000, fsmonitor=False):
+        """
+        Initialize a Tuner object. The status accelerators are recommended if
+        the index of `repo' has at least `minEntries' entries, or if `git
+        status' takes at least `minLatency' seconds. A commit-graph is
+        recommended if the repository has at least `minCommits' commits.
+        feature.manyFiles is only recommended for indexes of at least
+        `manyFiles' entries, and core.fsmonitor only if `fsmonitor' is True.
+        """
+        self.repo = repo
+        self.minEntries = minEntries
+        self.minLatency = minLatency
+        self.minCommits = minCommits
+        self.manyFiles = manyFiles
+        self.fsmonitor = fsmonitor
+
+        self.entries = 0
+        self.commits = None
+        self.statusTime = None
+        self.expectedTime = None
+        self.settings = list()
+        self.commitGraph = False
+
+    def timeStatus(self, untracked=True):
+        """
+        INTERNAL. Return the best of two wall-clock times of `git status' in
+        seconds. The index is not rewritten, so measuring has no side effects.
+        """
+        args = ['--no-optional-locks', 'status', '--porcelain',
+                '--ignore-submodules']
+        if not untracked:
+            args.append('--untracked-files=no')
+        times = list()
+        for _ in range(2):
+            start = time.monotonic()
+            self.repo.backend.run(args)
+            times.append(time.monotonic() - start)
+        return min(times)
+
+    def measure(self):
+        """
+        Measure the repository and fill in the recommended settings. Returns
+        True if anything is recommended.
+        """
+        config = readGitConfig(self.repo.commonDir + '/config')
+        objectsDir = self.repo.commonDir + '/objects/info'
+        self.commitGraph = False
+        if not (os.path.exists(objectsDir + '/commit-graph')
+                or os.path.exists(objectsDir
+                                  + '/commit-graphs/commit-graph-chain')):
+            # History walks are only slow enough to matter in long histories.
+            self.commits = int(self.repo.backend.run(['rev-list', '--all',
+                                                      '--count']))
+            self.commitGraph = self.commits >= self.minCommits
+        if self.repo.bare:
+            return self.commitGraph
+
+        self.entries = readIndexEntryCount(self.repo.gitDir)
+        self.statusTime = self.timeStatus()
+        # Most of what the untracked cache and fsmonitor save is the scan for
+        # untracked files, so a status without it is what to expect.
+        self.expectedTime = self.timeStatus(untracked=False)
+
+        if self.entries >= self.minEntries \
+           or self.statusTime >= self.minLatency:
+            for setting, value in self.STATUS_SETTINGS:
+                if setting == 'core.fsmonitor' and not self.fsmonitor:
+                    continue
+                if setting == 'feature.manyFiles' \
+                   and self.entries < self.manyFiles:
+                    continue
+                if config.get(setting.lower(), '').lower() != value:
+                    self.settings.append((setting, value))
+        return bool(self.settings) or self.commitGraph
+
+    def describe(self):
+        """Return a line describing the measurements and recommendations."""
+        changes = [setting for setting, value in self.settings]
+        if self.commitGraph:
+            changes.append('commit-graph')
+        if self.statusTime is None:
+            timing = ' ' * 20
+        else:
+            timing = '{:7.3f}s -> {:7.3f}s'.format(self.statusTime,
+                                                   self.expectedTime)
+        commits = '' if self.commits is None else self.commits
+        return '{:>8} {:>8} {} {} {}'.format(self.entries, commits, timing,
+                                             self.repo.workTree,
+                                             ' '.join(changes))
+
+    def apply(self):
+        """Turn on the recommended settings and write the commit-graph."""
+        backend = self.repo.backend
+        for setting, value in self.settings:
+            backend.run(['config', setting, value])
+        if self.settings:
+            # Populate the untracked cache (and start the fsmonitor daemon).
+            backend.run(['status', '--porcelain'])
+        if self.commitGraph:
+            backend.run(['commit-graph', 'write', '--reachable', '--split'])
+
+##############################################################################
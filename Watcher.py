@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""Watches repositories for changes using inotify"""
+###############################################################################
+# NAME:             Watcher.py
+#
+# AUTHOR:           Ethan D. Twardy <edtwardy@mtu.edu>
+#
+# DESCRIPTION:      Implements the inotify-driven live view for `list --watch'.
+#                   The inotify API is reached through ctypes, so this module
+#                   only works on Linux.
+#
+# CREATED:          10/18/2026
+#
+# LAST EDITED:      10/18/2026
+###
+
+###############################################################################
+# IMPORTS
+###
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import shutil
+import struct
+import time
+
+from colorama.colorama import Cursor
+from colorama.colorama.ansi import clear_line, clear_screen
+
+###############################################################################
+# Constants
+###
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Events that may change the output of `git status'
+TREE_EVENTS = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM
+               | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+               | IN_MOVE_SELF)
+# Git writes refs, HEAD and the index to a lockfile and renames it into place.
+GIT_EVENTS = IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_CLOSE_WRITE
+
+EVENT_HEADER = struct.Struct('iIII')
+
+###############################################################################
+# class Inotify
+###
+
+class Inotify:
+    """Thin wrapper around an inotify file descriptor."""
+
+    def __init__(self):
+        """Initialize a new inotify instance."""
+        libcName = ctypes.util.find_library('c')
+        if libcName is None:
+            raise OSError('inotify is not available on this system')
+        self.libc = ctypes.CDLL(libcName, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError('inotify is not available on this system')
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            self.raiseErrno('inotify_init1')
+
+    @staticmethod
+    def raiseErrno(function):
+        """INTERNAL. Raise an OSError for the current value of errno."""
+        code = ctypes.get_errno()
+        raise OSError(code, '{}: {}'.format(function, os.strerror(code)))
+
+    def fileno(self):
+        """Return the inotify file descriptor."""
+        return self.fd
+
+    def addWatch(self, path, mask):
+        """Add a watch on `path' and return its watch descriptor."""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            self.raiseErrno('inotify_add_watch')
+        return wd
+
+    def removeWatch(self, wd):
+        """Remove the watch with descriptor `wd'."""
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def readEvents(self):
+        """
+        Read all of the queued events. Returns a list of (wd, mask, name)
+        tuples.
+        """
+        events = list()
+        while True:
+            try:
+                buf = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buf):
+                #pylint: disable=unused-variable
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(buf, offset)
+                offset += EVENT_HEADER.size
+                name = buf[offset:offset + length].rstrip(b'\0')
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        """Close the inotify instance, releasing all of its watches."""
+        os.close(self.fd)
+
+###############################################################################
+# class RepositoryWatcher
+###
+
+class RepositoryWatcher:
+    """
+    Maintains inotify watches on the git directory and the working tree of a
+    set of repositories, and reports which repositories have changed.
+    """
+
+    def __init__(self, logger=None):
+        """Initialize a RepositoryWatcher object."""
+        self.inotify = Inotify()
+        self.logger = logger
+        # Maps a watch descriptor to (path, isGitDir), and to the set of
+        # repositories sharing it (worktrees share their common directory).
+        self.watches = dict()
+        self.watchers = dict()
+        self.repos = list()
+        self.workTrees = set()
+
+    def log(self, message):
+        """INTERNAL. Log `message', if we have a logger."""
+        if self.logger is not None:
+            self.logger(message)
+
+    def addWatch(self, repo, path, mask, isGitDir):
+        """INTERNAL. Watch `path' on behalf of `repo'."""
+        try:
+            wd = self.inotify.addWatch(path, mask | IN_ONLYDIR
+                                       | IN_DONT_FOLLOW)
+        except OSError as error:
+            if error.errno == errno.ENOSPC:
+                self.log('Out of inotify watches at {} (see '
+                         'fs.inotify.max_user_watches)'.format(path))
+            return
+        self.watches[wd] = (path, isGitDir)
+        self.watchers.setdefault(wd, set()).add(repo)
+
+    def watchTree(self, repo, top, mask, isGitDir, exclude=()):
+        """INTERNAL. Recursively watch all directories under `top'."""
+        #pylint: disable=unused-variable
+        for dirpath, dirnames, filenames in os.walk(top):
+            self.addWatch(repo, dirpath, mask, isGitDir)
+            dirnames[:] = [entry for entry in dirnames if entry != '.git'
+                           and os.path.join(dirpath, entry) not in exclude]
+
+    def watchRepositories(self, repos):
+        """Watch each repository in `repos'."""
+        self.workTrees = {repo.workTree for repo in repos}
+        for repo in repos:
+            self.watchRepository(repo)
+
+    def watchRepository(self, repo):
+        """
+        Watch the parts of `repo' that can change its status: HEAD and the
+        index (in the git directory), the refs and packed-refs, the stash log
+        (in the common directory), and the directories of the working tree, if
+        it has one. If submodules are shown, theirs are watched on behalf of
+        `repo' as well.
+        """
+        self.repos.append(repo)
+        self.watchParts(repo, repo)
+
+    def watchParts(self, repo, part):
+        """
+        INTERNAL. Watch the git directories and working tree of `part' (`repo'
+        itself, or one of its submodules) on behalf of `repo'.
+        """
+        for gitDir in {part.gitDir, part.commonDir}:
+            self.addWatch(repo, gitDir, GIT_EVENTS, True)
+            for subdir in ('refs', 'logs/refs'):
+                if os.path.isdir(os.path.join(gitDir, subdir)):
+                    self.watchTree(repo, os.path.join(gitDir, subdir),
+                                   GIT_EVENTS, True)
+
+        if part.bare:
+            return
+
+        # Repositories nested in this working tree have watches of their own.
+        self.watchTree(repo, part.workTree, TREE_EVENTS, False,
+                       exclude=self.workTrees)
+        if not repo.repoFlags.getSubmodules():
+            return
+        try:
+            submodules = part.makeSubmodules()
+        except (ValueError, OSError) as error:
+            self.log('Cannot watch the submodules of {}: {}'.format(
+                part.workTree, error))
+            return
+        for submodule in submodules:
+            self.watchParts(repo, submodule)
+
+    def unwatchRepository(self, repo):
+        """
+        Stop watching `repo' (e.g. because it can no longer be probed). The
+        watches it shares with other repositories are kept.
+        """
+        if repo in self.repos:
+            self.repos.remove(repo)
+        for wd in [wd for wd, repos in self.watchers.items() if repo in repos]:
+            self.watchers[wd].discard(repo)
+            if not self.watchers[wd]:
+                self.inotify.removeWatch(wd)
+                del self.watchers[wd]
+                del self.watches[wd]
+
+    def handleEvents(self):
+        """INTERNAL. Read pending events and return the changed repos."""
+        changed = set()
+        for wd, mask, name in self.inotify.readEvents():
+            if mask & IN_Q_OVERFLOW:
+                self.log('inotify queue overflowed; probing all repositories')
+                changed.update(self.repos)
+                continue
+            if wd not in self.watches:
+                continue
+            path, isGitDir = self.watches[wd]
+            repos = self.watchers[wd]
+            if mask & IN_IGNORED:
+                del self.watches[wd]
+                del self.watchers[wd]
+                continue
+
+            if isGitDir:
+                # The lockfile is renamed to its final name, which generates
+                # an event of its own. FETCH_HEAD is written by every fetch,
+                # including our own, and does not change the status.
+                if name.endswith('.lock') or name == 'FETCH_HEAD':
+                    continue
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                for repo in repos:
+                    self.watchTree(repo, os.path.join(path, name),
+                                   GIT_EVENTS if isGitDir else TREE_EVENTS,
+                                   isGitDir)
+            changed.update(repos)
+        return changed
+
+    def waitForChanges(self, debounce=0.25, maxDelay=2.0):
+        """
+        Block until at least one repository has changed, then wait until no
+        events have arrived for `debounce' seconds (but no longer than
+        `maxDelay' seconds in total), so that bursts of events generated by
+        checkouts or builds result in a single probe. Returns the set of
+        changed repositories.
+        """
+        changed = set()
+        while not changed:
+            select.select([self.inotify], [], [])
+            changed = self.handleEvents()
+
+        deadline = time.monotonic() + maxDelay
+        while True:
+            timeout = min(debounce, deadline - time.monotonic())
+            if timeout <= 0:
+                break
+            ready = select.select([self.inotify], [], [], timeout)[0]
+            if not ready:
+                break
+            changed.update(self.handleEvents())
+        return changed
+
+    def close(self):
+        """Release the inotify instance."""
+        self.inotify.close()
+
+###############################################################################
+# class LiveView
+###
+
+class LiveView:
+    """
+    A list of text blocks printed to a terminal, which can be redrawn in place
+    as individual blocks change.
+    """
+
+    def __init__(self, outFile):
+        """Initialize a LiveView object."""
+        self.outFile = outFile
+        self.blocks = list()
+
+    @staticmethod
+    def lineCount(block):
+        """INTERNAL. Return the number of terminal lines in `block'."""
+        return block.count('\n')
+
+    def writeBlocks(self, blocks):
+        """INTERNAL. Write each line of `blocks', clearing the line first."""
+        for block in blocks:
+            for line in block.splitlines():
+                self.outFile.write(clear_line() + line + '\n')
+
+    def draw(self, blocks):
+        """Draw `blocks' for the first time."""
+        self.blocks = list(blocks)
+        self.writeBlocks(self.blocks)
+        self.outFile.flush()
+
+    def update(self, blocks):
+        """Redraw only the blocks that differ from what is on screen."""
+        changed = [index for index, block in enumerate(blocks)
+                   if block != self.blocks[index]]
+        if not changed:
+            return
+
+        total = sum(self.lineCount(block) for block in self.blocks)
+        height = shutil.get_terminal_size().lines
+        if max(total, sum(self.lineCount(block) for block in blocks)) \
+           >= height:
+            # The cursor cannot move above the top of the screen, so rows
+            # that have scrolled off cannot be rewritten in place.
+            self.outFile.write(Cursor.POS() + clear_screen())
+            self.writeBlocks(blocks)
+        elif all(self.lineCount(blocks[index])
+                 == self.lineCount(self.blocks[index]) for index in changed):
+            # Every block still fits in its rows: rewrite each of them alone.
+            for index in changed:
+                offset = sum(self.lineCount(block)
+                             for block in self.blocks[:index])
+                self.moveUp(total - offset)
+                self.writeBlocks([blocks[index]])
+                below = total - offset - self.lineCount(blocks[index])
+                if below:
+                    self.outFile.write(Cursor.DOWN(below))
+        else:
+            # The rows below the first change have shifted.
+            offset = sum(self.lineCount(block)
+                         for block in self.blocks[:changed[0]])
+            self.moveUp(total - offset)
+            self.outFile.write(clear_screen(0))
+            self.writeBlocks(blocks[changed[0]:])
+
+        self.blocks = list(blocks)
+        self.outFile.flush()
+
+    def moveUp(self, lines):
+        """INTERNAL. Move the cursor to the start of the line `lines' up."""
+        self.outFile.write('\r')
+        if lines:
+            self.outFile.write(Cursor.UP(lines))
+
+##############################################################################